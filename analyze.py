@@ -6,21 +6,14 @@ Run this from command line to see the metrics table without starting the web ser
 import pandas as pd
 import numpy as np
 
+from riskapp.store import load_price_frame
+
 CSV_PATH = r"d:\Risk reward\data.csv"
 
 def calculate_metrics():
     """Calculate CAGR, Volatility, and Risk for all index columns."""
-    df = pd.read_csv(CSV_PATH)
-    
-    if "DATE" not in df.columns:
-        raise ValueError("Expected a 'DATE' column in the CSV.")
-    
-    # Parse DATE and sort
-    df["DATE"] = pd.to_datetime(df["DATE"], format='%d/%m/%y', errors="coerce")
-    df = df.dropna(subset=["DATE"]).sort_values("DATE")
-    
-    # Set DATE as index
-    df = df.set_index("DATE")
+    # DATE-indexed prices (read from the binary sidecar when it is current)
+    df = load_price_frame(CSV_PATH)
     
     # All remaining columns are index price series
     price_cols = df.columns
@@ -1,7 +1,24 @@
 from flask import Flask, render_template, jsonify, request
 import pandas as pd
 import numpy as np
+import logging
+import math
 import os
+import threading
+import time
+
+from riskapp.cache import LRUCache, SerializedBody, file_fingerprint
+from riskapp.engine import compute_panel_metrics, duration_start
+from riskapp.heatmap import HEATMAP_MODES, HEATMAP_TIMELINES, build_monthly_panel, heatmap_payloads
+from riskapp.logconfig import configure_logging, trace_logger
+from riskapp.names import NAME_RESOLVER
+from riskapp.ranking import percentile_ranks
+from riskapp.results import MetricsTable
+from riskapp.store import get_price_store
+from riskapp.timing import TIMER, server_timing
+from riskapp.v1 import V1_SOURCES, get_v1_map
+from riskapp.v1store import get_v1_store
+from riskapp.windows import get_window_index, resolve_window, window_panel_metrics
 
 # Support deployment under a URL prefix - reads from X-Forwarded-Prefix header
 class PrefixMiddleware(object):
@@ -17,283 +34,212 @@ class PrefixMiddleware(object):
 
 app = Flask(__name__)
 
+# Log records go through a queue to a background writer (levels from RISKAPP_LOG_* env vars)
+configure_logging()
+logger = logging.getLogger("app")
+
 # Always apply prefix middleware to support nginx proxy
 app.wsgi_app = PrefixMiddleware(app.wsgi_app)
 
 # Use relative path for production deployment
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-CSV_PATH = os.path.join(BASE_DIR, "data.csv")
+# RISKAPP_CSV_PATH points the app at another price file (e.g. benchmark data)
+CSV_PATH = os.environ.get("RISKAPP_CSV_PATH", os.path.join(BASE_DIR, "data.csv"))
 V1_XLSX_PATH = os.path.join(BASE_DIR, "heatmap values.xlsx")
+# RISKAPP_V1_SOURCE=computed ranks 5-year CAGRs from data.csv instead of reading V1 from the workbook
+V1_SOURCE = os.environ.get("RISKAPP_V1_SOURCE", "excel")
+if V1_SOURCE not in V1_SOURCES:
+    raise ValueError(f"Invalid RISKAPP_V1_SOURCE '{V1_SOURCE}', expected one of {', '.join(V1_SOURCES)}")
+
+# Parsed once per process, reloaded when data.csv changes
+PRICE_STORE = get_price_store(CSV_PATH)
+
+# Computed metrics keyed by (data.csv, heatmap values.xlsx, duration)
+METRICS_CACHE = LRUCache(maxsize=16)
+
+# V1 workbook rows, shared and reloaded when heatmap values.xlsx changes
+V1_STORE = get_v1_store(V1_XLSX_PATH)
 
-# Load V1 values from Excel at startup
 def load_v1_values():
     """Load V1 average values from heatmap values.xlsx"""
     try:
-        df_v1 = pd.read_excel(V1_XLSX_PATH)
-        # Create a dictionary of Full Name to Percentile Value
-        v1_percentile = dict(zip(df_v1['Full Name'], df_v1['Percentile Value']))
-        
-        # Load the name mapping to convert Full Names to CSV column names
-        try:
-            from index_name_mapping import FULLNAME_TO_COLUMN, COLUMN_TO_FULLNAME
-            # Convert Full Name -> Column Name dictionary
-            v1_percentile_final = {}
-            fullname_map = {}
-            for full_name, percentile in v1_percentile.items():
-                column_name = FULLNAME_TO_COLUMN.get(full_name, full_name)
-                v1_percentile_final[column_name] = round(percentile, 2)
-                fullname_map[column_name] = full_name
-            return v1_percentile_final, fullname_map
-        except ImportError:
-            print("Warning: Could not import index_name_mapping")
-            return v1_percentile, {}
-
-        # Create name mapping ONLY for indices that have exact or very close matches in heatmap values.xlsx
-        name_mapping = {
-            'NMCSEL': 'NMIDSEL',
-            'NFINS2550': 'NFINS25',
-            'NFINSXB': 'NFINSEXB',
-            'N100EWT': 'N100EQWT',
-            'NHBET50': 'NHBETA50',
-            'NT10EWT': 'NT10EQWT',
-            'NT15EWT': 'NT15EW',
-            'NT20EWT': 'NT20EW',
-            'N100QL30': 'N100QLT30',
-            'NMC150M50': 'NM150M50',
-            'N500FQ30': 'N5FCQ3',
-            'N500LV50': 'N5LV5',
-            'N500M50': 'N500M50',
-            'N500QL50': 'N500QLT50',
-            'N500MQLV': 'NMQLV',
-            'NMC150Q': 'NMC150Q',
-            'N500MQ50': 'N5MCMQ5',
-            'N50EQWGT': 'N50EQWGT',
-            'N50V20': 'N50V20',
-            'N200V30': 'N200V30',
-            'N500V50': 'N500V50',
-            'N200QL30': 'N200Q30',
-            'N100ESG': 'N100ESG',
-            'N100ESGE': 'N100ESGE',
-            'N100ESGSL': 'N100ESGSL',
-            'N100LIQ15': 'NLCLIQ15',
-            'N50SH': 'N50SH',
-            'N500SH': 'N500SH',
-            'NHOUS': 'NHOUSING',
-            'NREIT': 'NREiT',
-            'NTATA25': 'NTATA25C',
-            'NCONTRA': 'NCONTRA',
-            'NNACON': 'NNACON',
-            'NQLV30': 'NQLV30',
-            'NQLLV30': 'NQLV30',
-            'NENRGY': 'NENERGY',
-            'NIIL': 'NIINT',
-            'NMCL15': 'NMIDLIQ15',
-            'NRURAL': 'NRRL',
-            'NMF5032': 'NMFG532',
-            'NINF5032': 'NINFRA532',
-            'NIRLPSU': 'NRPSU',
-            'NINACON': 'NNACON',
-            'NWAVES': 'NWVS',
-            'NCAPMRKT': 'NCM',
-            'NIFTY500 EQUAL WEIGHT.1': 'N500EQWT',
-        }
-        
-        # Apply name mapping - add mapped names to v1_percentile dictionary
-        v1_percentile_final_mapped = v1_percentile_final.copy()
-        fullname_map_final = fullname_map.copy()
-        for data_name, v1_name in name_mapping.items():
-            if v1_name in v1_percentile_final:
-                v1_percentile_final_mapped[data_name] = v1_percentile_final[v1_name]
-                if v1_name in fullname_map:
-                    fullname_map_final[data_name] = fullname_map[v1_name]
-        
-        return v1_percentile_final_mapped, fullname_map_final
+        # Parsed rows come from the JSON snapshot while the workbook is unchanged;
+        # Full Names resolve to CSV column names (codes and aliases) through NAME_RESOLVER
+        return V1_STORE.snapshot().by_column(NAME_RESOLVER)
     except Exception as e:
-        print(f"Warning: Could not load heatmap values.xlsx: {e}")
+        logger.warning("Could not load heatmap values.xlsx: %s", e)
         return {}, {}
 
 V1_PERCENTILE_MAP, FULLNAME_MAP = load_v1_values()
 
-def calculate_metrics(duration='all'):
-    """Calculate CAGR, Volatility, Risk, and Momentum for all index columns.
+# Encoded JSON responses per data version (metrics and heatmaps); warm_caches
+# grows it to hold a full warm-up plus RESPONSE_CACHE_HEADROOM on-demand entries
+RESPONSE_CACHE_HEADROOM = int(os.environ.get("RESPONSE_CACHE_HEADROOM", 1024))
+RESPONSE_CACHE = LRUCache(maxsize=2048)
+
+def serialized_json(key, build):
+    """Get the encoded JSON body for a cache key, building it on a miss.
     
     Args:
-        duration: '3years', '5years', or 'all'
+        key: Cache key, including the fingerprint of every input file
+        build: Zero-argument callable returning the JSON-serializable payload
     """
-    df = pd.read_csv(CSV_PATH)
+    def encode():
+        payload = build()
+        with TIMER.stage('serialize'):
+            return SerializedBody(jsonify(payload).get_data())
     
-    if "DATE" not in df.columns:
-        raise ValueError("Expected a 'DATE' column in the CSV.")
+    return RESPONSE_CACHE.get_or_compute(key, encode)
+
+def cached_json_response(key, build):
+    """Serve a JSON body that is encoded (and gzipped) once per cache key.
     
-    # Parse DATE and sort
-    df["DATE"] = pd.to_datetime(df["DATE"], format='%d/%m/%y', errors="coerce")
-    df = df.dropna(subset=["DATE"]).sort_values("DATE")
+    The response carries a strong ETag, so browsers and nginx revalidate
+    with If-None-Match and get an empty 304 while the data is unchanged.
     
-    # Set DATE as index
-    df = df.set_index("DATE")
+    Args:
+        key: Cache key, including the fingerprint of every input file
+        build: Zero-argument callable returning the JSON-serializable payload
+    """
+    serialized = serialized_json(key, build)
+    
+    use_gzip = serialized.gzip_body is not None and request.accept_encodings['gzip'] > 0
+    etag = serialized.gzip_etag if use_gzip else serialized.etag
     
-    # Keep full dataset for V1 calculation
-    df_full = df.copy()
+    if (request.if_none_match.contains_weak(serialized.etag)
+            or request.if_none_match.contains_weak(serialized.gzip_etag)):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(
+            serialized.gzip_body if use_gzip else serialized.body, mimetype='application/json'
+        )
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+    
+    response.set_etag(etag)
+    # Cacheable, but always revalidated so a new data.csv shows up immediately
+    response.headers['Cache-Control'] = 'no-cache'
+    if serialized.gzip_body is not None:
+        response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def calculate_metrics(duration='all', window=None):
+    """Calculate CAGR, Volatility, Risk, and Momentum for all index columns.
     
-    # Filter by duration for other metrics
-    if duration == '3years':
-        cutoff_date = df.index.max() - pd.DateOffset(years=3)
-        df = df[df.index >= cutoff_date]
-    elif duration == '5years':
-        cutoff_date = df.index.max() - pd.DateOffset(years=5)
-        df = df[df.index >= cutoff_date]
-    # 'all' uses full dataset
+    Results are cached until data.csv or heatmap values.xlsx changes.
     
-    # All remaining columns are index price series
-    price_cols = df.columns
+    Args:
+        duration: '3years', '5years', or 'all'
+        window: (start_row, end_row) of a custom date window (see
+            metrics_window); replaces duration
+    """
+    key = (PRICE_STORE.fingerprint(), file_fingerprint(V1_XLSX_PATH), duration if window is None else window)
+    results = METRICS_CACHE.get_or_compute(key, lambda: _compute_metrics(duration, window))
+    # JSON rows are built here, as new dicts, from the cached columnar table
+    return results.to_records()
+
+def metrics_window(duration='all', start=None, end=None, as_of=None):
+    """Row window of a custom start/end/as_of metrics request (None without one).
+    
+    Raises:
+        ValueError if a date can't be parsed
+    """
+    if start is None and end is None and as_of is None:
+        return None
+    return resolve_window(PRICE_STORE.get_frame().index, duration, start, end, as_of)
+
+def _compute_metrics(duration, window=None):
+    """Uncached body of calculate_metrics"""
+    with TIMER.stage('load'):
+        snapshot = PRICE_STORE.snapshot()
+    df = snapshot.frame
     
     # Skip duplicate indices (these are the same data with different names)
     skip_indices = ['NIFTY 10 YR BENCHMARK G-SEC.1']  # Same as N10YRGS
+    price_cols = df.columns
     
-    results = []
-    
-    for col in price_cols:
-        # Skip duplicate indices
-        if col in skip_indices:
-            continue
-            
-        prices = df[col].astype(float)
-        
-        # Drop missing prices
-        non_na = prices.dropna()
-        if len(non_na) < 2:
-            continue
-        
-        # Get full price series for V1 calculation (need 9+ years of data)
-        full_prices = df_full[col].astype(float).dropna()
-        
-        p_start = non_na.iloc[0]
-        p_end = non_na.iloc[-1]
-        n_days = (non_na.index[-1] - non_na.index[0]).days
-        if n_days <= 0 or p_start == 0:
-            continue
-        
-        # Trading years approximation
-        n_years = n_days / 365.0
-        if n_years == 0:
-            continue
-        
-        # 1. Return (CAGR)
-        cagr = (p_end / p_start) ** (1.0 / n_years) - 1.0
-        if not np.isfinite(cagr):
-            continue
-        
-        # 2. Volatility (Annualized Standard Deviation)
-        daily_returns = non_na.pct_change().dropna()
-        if len(daily_returns) < 2:
-            continue
-        daily_vol = daily_returns.std(ddof=1)
-        if not np.isfinite(daily_vol):
-            continue
-        annual_vol = daily_vol * np.sqrt(252)
-        
-        # 3. Risk = Std * 3.45 * 0.45
-        risk = (annual_vol * 100) * 3.45 * 0.45
-        if not np.isfinite(risk):
-            continue
-        
-        # 4. Calculate 12-month return for momentum (store raw value for now)
-        if len(non_na) >= 252:  # At least 1 year of trading data (252 trading days)
-            p_current = non_na.iloc[-1]
-            p_12m_ago = non_na.iloc[-252]
-            if p_12m_ago != 0:
-                momentum_12m = ((p_current - p_12m_ago) / p_12m_ago) * 100
-            else:
-                momentum_12m = None
+    # CAGR, volatility and 12-month momentum for every index in one pass,
+    # straight on the shared price matrix (selecting columns would copy it)
+    with TIMER.stage('compute'):
+        if window is not None:
+            # Any start/end/as_of window is a lookup in the prefix sums
+            panel = window_panel_metrics(get_window_index(snapshot), *window)
         else:
-            momentum_12m = None
-        
-        if momentum_12m is not None and not np.isfinite(momentum_12m):
-            momentum_12m = None
-        
-        # Store index results with 3-year return for V1 calculation later
-        results.append({
-            "Index Name": col,
-            "Ret": round(cagr * 100, 1),
-            "Risk": round(risk, 1),
-            "Momentum_12m": momentum_12m,
-            "ThreeYearReturn": None  # Will calculate next
-        })
+            panel = compute_panel_metrics(df, duration, lookbacks=False)
     
-    # Calculate 3-year returns for V1 calculation
-    three_year_cutoff = df_full.index.max() - pd.DateOffset(years=3)
+    rank_start = time.perf_counter()
+    rows = np.flatnonzero(panel['valid'] & ~np.isin(np.asarray(price_cols, dtype=object), skip_indices))
+    names = np.asarray(price_cols, dtype=object)[rows]
     
-    for result in results:
-        col = result["Index Name"]
-        full_prices = df_full[col].astype(float).dropna()
-        
-        # Get last 3 years of data
-        three_year_prices = full_prices[full_prices.index >= three_year_cutoff]
-        
-        if len(three_year_prices) >= 2:
-            p_start_3y = three_year_prices.iloc[0]
-            p_end_3y = three_year_prices.iloc[-1]
-            n_days_3y = (three_year_prices.index[-1] - three_year_prices.index[0]).days
-            n_years_3y = n_days_3y / 365.0
-            
-            if n_years_3y > 0 and p_start_3y > 0:
-                cagr_3y = (p_end_3y / p_start_3y) ** (1.0 / n_years_3y) - 1.0
-                if np.isfinite(cagr_3y):
-                    result["ThreeYearReturn"] = cagr_3y
+    # Risk = Std * 3.45 * 0.45
+    risk = (panel['annual_vol'][rows] * 100) * 3.45 * 0.45
+    momentum = panel['momentum_12m'][rows]
     
     # Assign V1 values directly from heatmap values.xlsx percentile mapping
-    for result in results:
-        index_name = result['Index Name']
-        if index_name in V1_PERCENTILE_MAP:
-            result['V1'] = V1_PERCENTILE_MAP[index_name]
-        else:
-            result['V1'] = None  # No V1 value if not in heatmap values.xlsx
-        
-        # Add Full Name from mapping
-        if index_name in FULLNAME_MAP:
-            result['Full Name'] = FULLNAME_MAP[index_name]
-        else:
-            # Fallback to index name if no mapping
-            try:
-                from index_name_mapping import COLUMN_TO_FULLNAME
-                result['Full Name'] = COLUMN_TO_FULLNAME.get(index_name, index_name)
-            except ImportError:
-                result['Full Name'] = index_name
-    
-    # Remove temporary ThreeYearReturn field
-    for result in results:
-        if 'ThreeYearReturn' in result:
-            del result['ThreeYearReturn']
-    
-    # Calculate Relative Momentum (RMom) as percentile rank
-    # Extract all valid momentum values
-    valid_momentum_data = [(i, r['Momentum_12m']) for i, r in enumerate(results) if r['Momentum_12m'] is not None]
-    
-    if len(valid_momentum_data) > 1:
-        # Sort by momentum value to get rankings
-        sorted_momentum = sorted(valid_momentum_data, key=lambda x: x[1])
-        
-        # Assign percentile rank (0-100 scale)
-        for rank, (original_idx, momentum_value) in enumerate(sorted_momentum):
-            # Percentile = (rank / (n-1)) * 100, where rank starts from 0
-            n = len(sorted_momentum)
-            if n > 1:
-                percentile = (rank / (n - 1)) * 100
-            else:
-                percentile = 50  # Single value gets 50th percentile
-            
-            results[original_idx]['RMom'] = round(percentile, 1)
+    # (re-read only if the workbook changed since the last call)
+    v1_percentile_map, fullname_map = load_v1_values()
+    if V1_SOURCE == 'computed':
+        # Ranked across the whole universe, rebuilt once per data version
+        v1_percentile_map = get_v1_map(snapshot)
+    # No V1 value if not in heatmap values.xlsx
+    v1 = np.array([v1_percentile_map.get(name, np.nan) for name in names], dtype=float)
+    # Full Name from mapping, falling back to the mapped display name (or the
+    # index name itself when another index already shows that name)
+    full_names = np.array(NAME_RESOLVER.display_names(names, fullname_map), dtype=object)
+    
+    # Calculate Relative Momentum (RMom) as percentile rank (0-100 scale);
+    # equal momentum values keep their list order
+    present = {}
+    if np.count_nonzero(~np.isnan(momentum)) > 1:
+        percentiles = percentile_ranks(momentum, ties='ordinal')
+        rmom = np.array([round(float(p), 1) for p in percentiles])
+        # Indices without momentum get no RMom field at all
+        present['RMom'] = ~np.isnan(percentiles)
     else:
         # Not enough data to calculate percentile
-        for result in results:
-            result['RMom'] = None
-    
-    # Remove temporary Momentum_12m field
-    for result in results:
-        del result['Momentum_12m']
-    
+        rmom = np.full(len(names), np.nan)
+    
+    results = MetricsTable({
+        "Index Name": names,
+        "Ret": np.round(panel['cagr'][rows] * 100, 1),
+        "Risk": np.round(risk, 1),
+        "V1": v1,
+        "Full Name": full_names,
+        "RMom": rmom,
+    }, present)
+    
+    TIMER.observe('rank', time.perf_counter() - rank_start)
     return results
 
+@app.before_request
+def start_stage_timer():
+    request.environ['riskapp.timer'] = (TIMER.begin(request.endpoint or 'unknown'), time.perf_counter())
+
+@app.after_request
+def add_server_timing(response):
+    started = request.environ.pop('riskapp.timer', None)
+    if started is not None:
+        token, start = started
+        total = time.perf_counter() - start
+        TIMER.observe('total', total)
+        stages = TIMER.end(token) + [('total', total)]
+        response.headers['Server-Timing'] = server_timing(stages)
+    return response
+
+@app.route("/api/_stats")
+def api_stats():
+    """Stage timing histograms and cache counters in Prometheus text format."""
+    lines = [TIMER.render_prometheus()]
+    caches = (('metrics', METRICS_CACHE.stats()), ('response', RESPONSE_CACHE.stats()))
+    for metric, kind, field in (('riskapp_cache_hits_total', 'counter', 'hits'),
+                                ('riskapp_cache_misses_total', 'counter', 'misses'),
+                                ('riskapp_cache_coalesced_total', 'counter', 'coalesced'),
+                                ('riskapp_cache_entries', 'gauge', 'size')):
+        lines.append(f"# TYPE {metric} {kind}\n")
+        for name, stats in caches:
+            lines.append(f'{metric}{{cache="{name}"}} {stats[field]}\n')
+    return app.response_class("".join(lines), mimetype='text/plain; version=0.0.4')
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -305,8 +251,26 @@ def heatmap():
 @app.route("/api/metrics")
 def api_metrics():
     duration = request.args.get('duration', 'all')
-    metrics = calculate_metrics(duration)
-    return jsonify(metrics)
+    try:
+        window = metrics_window(duration, request.args.get('start'), request.args.get('end'),
+                                request.args.get('as_of'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return cached_json_response(metrics_response_key(duration, window),
+                                lambda: calculate_metrics(duration, window))
+
+def metrics_response_key(duration, window=None):
+    """RESPONSE_CACHE key of /api/metrics for the current data files"""
+    return ('metrics', PRICE_STORE.fingerprint(), file_fingerprint(V1_XLSX_PATH),
+            duration if window is None else window)
+
+class ApiError(Exception):
+    """An API request that gets a JSON {"error": message} response"""
+    
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
 
 @app.route("/api/heatmap_data")
 def api_heatmap_data():
@@ -314,173 +278,242 @@ def api_heatmap_data():
     index_name = request.args.get('index')
     duration = request.args.get('duration', 'all')
     mode = request.args.get('mode', 'trailing')  # 'trailing' or 'rolling'
-    timeline = float(request.args.get('timeline', '3'))  # years (e.g., 1, 3, 3.5, 4, 4.5, 5)
+    try:
+        timeline = float(request.args.get('timeline', '3'))  # years (e.g., 1, 3, 3.5, 4, 4.5, 5)
+    except ValueError:
+        return jsonify({"error": "Invalid timeline"}), 400
     
-    if not index_name:
-        return jsonify({"error": "Index name required"}), 400
+    try:
+        key, build = prepare_heatmap_data(index_name, duration, mode, timeline)
+    except ApiError as e:
+        return jsonify({"error": e.message}), e.status
+    return cached_json_response(key, build)
+
+def prepare_heatmap_data(index_name, duration, mode, timeline):
+    """Validate a /api/heatmap_data request against the current data.
     
-    df = pd.read_csv(CSV_PATH)
+    Returns:
+        Tuple (key, build): the RESPONSE_CACHE key and a zero-argument
+        callable computing the response payload
     
-    if "DATE" not in df.columns:
-        return jsonify({"error": "Invalid CSV format"}), 500
+    Raises:
+        ApiError for a missing/unknown index, an unsupported mode or
+        timeline, too little data or an unreadable CSV
+    """
+    if not index_name:
+        raise ApiError("Index name required", 400)
+    error = heatmap_args_error([mode], [timeline])
+    if error:
+        raise ApiError(error, 400)
     
-    # Parse DATE and sort
-    df["DATE"] = pd.to_datetime(df["DATE"], format='%d/%m/%y', errors="coerce")
-    df = df.dropna(subset=["DATE"]).sort_values("DATE")
+    try:
+        with TIMER.stage('load'):
+            snapshot = PRICE_STORE.snapshot()
+    except ValueError:
+        raise ApiError("Invalid CSV format", 500)
+    df = snapshot.frame
     
     # Check if index exists
     if index_name not in df.columns:
-        return jsonify({"error": f"Index '{index_name}' not found"}), 404
-    
-    # Set DATE as index
-    df = df.set_index("DATE")
-    
-    # Apply duration filter
-    if duration == '1year':
-        cutoff_date = df.index.max() - pd.DateOffset(years=1)
-        df = df[df.index >= cutoff_date]
-    elif duration == '3years':
-        cutoff_date = df.index.max() - pd.DateOffset(years=3)
-        df = df[df.index >= cutoff_date]
-    elif duration == '5years':
-        cutoff_date = df.index.max() - pd.DateOffset(years=5)
-        df = df[df.index >= cutoff_date]
-    # 'all' uses full dataset
-    
-    # Get price series for the index
-    prices = df[index_name].astype(float).dropna()
+        raise ApiError(f"Index '{index_name}' not found", 404)
     
-    if len(prices) < 2:
-        return jsonify({"error": "Insufficient data"}), 400
+    with TIMER.stage('filter'):
+        # Apply duration filter ('all' uses full dataset)
+        start_row = duration_start(df.index, duration)
+        
+        # Get price series for the index
+        prices = df[index_name].iloc[start_row:].dropna()
     
-    # Find the first date where we have data
-    first_data_date = prices.index[0]
+    if len(prices) < 2:
+        raise ApiError("Insufficient data", 400)
+    
+    # Sampled debug trace (RISKAPP_DEBUG_SAMPLE / RISKAPP_DEBUG_INDEX); free when off
+    trace = trace_logger(index_name)
+    if trace:
+        # For trailing X years, we need X years of data before we can show any result
+        first_data_date = prices.index[0]
+        earliest_valid_date = first_data_date + pd.DateOffset(years=int(timeline)) + pd.DateOffset(months=int((timeline % 1) * 12))
+        trace.debug("Heatmap request", extra={
+            'index': index_name, 'mode': mode, 'timeline': timeline, 'duration': duration,
+            'first_data_date': str(first_data_date.date()),
+            'earliest_valid_date': str(earliest_valid_date.date()),
+        })
     
-    # Resample to monthly data (last day of month)
-    monthly_prices = prices.resample('M').last().dropna()
+    def build():
+        # Trailing: ((Price now / Price X years ago)^(1/X) - 1) * 100
+        # Rolling (forward): ((Price X years later / Price now)^(1/X) - 1) * 100
+        # computed for every month at once on the shared month-end panel,
+        # plus CAGR/volatility over the last X years of daily prices
+        with TIMER.stage('compute'):
+            monthly_panel = snapshot.derived('monthly_panel', build_monthly_panel)
+            payloads, _ = heatmap_payloads(df, monthly_panel, [index_name], start_row, [timeline], [mode])
+        result = payloads[index_name][mode][str(timeline)]
+        if trace:
+            trace.debug("Heatmap computed", extra={
+                'index': index_name, 'mode': mode, 'timeline': timeline,
+                'years': sorted(result["heatmapData"].keys()),
+            })
+        return result
+    
+    return heatmap_data_key(snapshot, index_name, start_row, mode, timeline), build
+
+def heatmap_data_key(snapshot, index_name, start_row, mode, timeline):
+    """RESPONSE_CACHE key of /api/heatmap_data (timeline as a float)"""
+    return ('heatmap', snapshot.fingerprint, index_name, start_row, mode, timeline)
+
+def heatmap_args_error(modes, timelines):
+    """Error message for an unsupported heatmap mode or timeline (None if all are valid)"""
+    for mode in modes:
+        if mode not in HEATMAP_MODES:
+            return f"Invalid mode '{mode}'"
+    for timeline in timelines:
+        try:
+            years = float(timeline)
+        except (TypeError, ValueError):
+            return "Invalid timeline"
+        # Annualizing divides by the timeline
+        if not math.isfinite(years) or years <= 0:
+            return "Invalid timeline"
+    return None
+
+@app.route("/api/heatmap_batch")
+def api_heatmap_batch():
+    """Heatmap grids for many indices, modes and timelines in one response.
     
-    # Calculate the earliest valid date for the selected timeline
-    # For trailing X years, we need X years of data before we can show any result
-    earliest_valid_date = first_data_date + pd.DateOffset(years=int(timeline)) + pd.DateOffset(months=int((timeline % 1) * 12))
+    Query args (repeatable): index, mode, timeline. Modes and timelines
+    default to every supported value.
+    """
+    index_names = request.args.getlist('index')
+    duration = request.args.get('duration', 'all')
+    modes = request.args.getlist('mode') or list(HEATMAP_MODES)
+    timelines = request.args.getlist('timeline') or list(HEATMAP_TIMELINES)
     
-    print(f"DEBUG: Index={index_name}, First data date={first_data_date}, Timeline={timeline}yrs, Earliest valid={earliest_valid_date}")
+    if not index_names:
+        return jsonify({"error": "At least one index required"}), 400
     
-    # Calculate trailing or rolling returns
-    lookback_months = int(timeline * 12)  # Convert years to months
+    error = heatmap_args_error(modes, timelines)
+    if error:
+        return jsonify({"error": error}), 400
     
-    heatmap_data = {}
+    try:
+        with TIMER.stage('load'):
+            snapshot = PRICE_STORE.snapshot()
+    except ValueError:
+        return jsonify({"error": "Invalid CSV format"}), 500
     
-    for i, (date, price) in enumerate(monthly_prices.items()):
-        date_ts = pd.to_datetime(date)
-        year = str(date_ts.year)
-        month = str(date_ts.month)
-        
-        if year not in heatmap_data:
-            heatmap_data[year] = {}
-        
-        # Calculate return based on mode
-        if mode == 'trailing':
-            # Trailing: Look BACK X years from this month
-            # Formula: ((Current Price - Price X years ago) / Price X years ago)^(1/n) * 100
-            if i >= lookback_months:
-                past_price = monthly_prices.iloc[i - lookback_months]
-                if past_price > 0 and pd.notna(price) and pd.notna(past_price):
-                    # Annualized return: ((Current - Past) / Past + 1)^(1/years) - 1
-                    annualized_return = (((price / past_price) ** (1.0 / timeline)) - 1.0) * 100
-                    heatmap_data[year][month] = float(annualized_return)
-                else:
-                    heatmap_data[year][month] = None
-            else:
-                # Not enough historical data before this month
-                heatmap_data[year][month] = None
-        else:
-            # Rolling (Forward): Look FORWARD X years from this month
-            # Formula: (Future Price / Current Price)^(1/years) - 1
-            # Check if we have enough future data
-            if i + lookback_months < len(monthly_prices):
-                future_price = monthly_prices.iloc[i + lookback_months]
-                if price > 0 and pd.notna(price) and pd.notna(future_price):
-                    # Annualized return: (Future/Current)^(1/years) - 1
-                    annualized_return = ((future_price / price) ** (1.0 / timeline) - 1.0) * 100
-                    heatmap_data[year][month] = float(annualized_return)
-                else:
-                    heatmap_data[year][month] = None
-            else:
-                # Not enough future data (too close to present)
-                heatmap_data[year][month] = None
-    
-    # Calculate metrics based on timeline
-    if timeline and timeline > 0:
-        # Use only the last X years of data for metrics (convert to days)
-        days_back = int(timeline * 365)
-        cutoff_date = prices.index.max() - pd.Timedelta(days=days_back)
-        timeline_prices = prices[prices.index >= cutoff_date]
-        
-        if len(timeline_prices) >= 2:
-            p_start = timeline_prices.iloc[0]
-            p_end = timeline_prices.iloc[-1]
-            n_days = (timeline_prices.index[-1] - timeline_prices.index[0]).days
-            n_years = n_days / 365.0
-            
-            cagr = None
-            if n_years > 0 and p_start > 0:
-                cagr = float((p_end / p_start) ** (1.0 / n_years) - 1.0)
-            
-            # Volatility for the timeline period
-            timeline_daily_returns = timeline_prices.pct_change().dropna()
-            timeline_daily_vol = timeline_daily_returns.std(ddof=1)
-            annual_vol = float(timeline_daily_vol * np.sqrt(252)) if np.isfinite(timeline_daily_vol) else None
-        else:
-            cagr = None
-            annual_vol = None
-    else:
-        # Fallback to full dataset
-        p_start = prices.iloc[0]
-        p_end = prices.iloc[-1]
-        n_days = (prices.index[-1] - prices.index[0]).days
-        n_years = n_days / 365.0
+    remember_heatmap_batch(index_names, duration, modes, timelines)
+    key = heatmap_batch_key(snapshot, index_names, duration, modes, timelines)
+    return cached_json_response(
+        key, lambda: build_heatmap_batch(snapshot, index_names, duration, modes, timelines)
+    )
+
+# Recently requested /api/heatmap_batch queries (e.g. the heatmap page's
+# per-category batches), warmed again for every new data version
+RECENT_BATCHES_MAX = 64
+_RECENT_BATCHES = {}
+_RECENT_BATCHES_LOCK = threading.Lock()
+
+def remember_heatmap_batch(index_names, duration, modes, timelines):
+    """Record a valid /api/heatmap_batch query for warm_caches (most recent kept)"""
+    query = (tuple(index_names), duration, tuple(modes), tuple(timelines))
+    with _RECENT_BATCHES_LOCK:
+        _RECENT_BATCHES.pop(query, None)
+        _RECENT_BATCHES[query] = None
+        while len(_RECENT_BATCHES) > RECENT_BATCHES_MAX:
+            del _RECENT_BATCHES[next(iter(_RECENT_BATCHES))]
+
+def heatmap_batch_key(snapshot, index_names, duration, modes, timelines):
+    """RESPONSE_CACHE key of /api/heatmap_batch"""
+    return ('heatmap_batch', snapshot.fingerprint, tuple(index_names), duration, tuple(modes), tuple(timelines))
+
+def build_heatmap_batch(snapshot, index_names, duration, modes, timelines):
+    """Response body of /api/heatmap_batch for one data snapshot"""
+    df = snapshot.frame
+    with TIMER.stage('filter'):
+        errors = {name: f"Index '{name}' not found" for name in index_names if name not in df.columns}
+        found = [name for name in dict.fromkeys(index_names) if name in df.columns]
+        start_row = duration_start(df.index, duration)
+    
+    with TIMER.stage('compute'):
+        monthly_panel = snapshot.derived('monthly_panel', build_monthly_panel)
+        heatmaps, insufficient = heatmap_payloads(df, monthly_panel, found, start_row, timelines, modes)
+    errors.update(insufficient)
+    return {
+        "duration": duration,
+        "heatmaps": heatmaps,
+        "errors": errors
+    }
+
+# Durations the pages request, warmed before any user asks for them
+WARMUP_DURATIONS = ('all', '3years', '5years')
+WARMUP_POLL_SECONDS = float(os.environ.get("WARMUP_POLL_SECONDS", 10))
+
+def warm_caches():
+    """Precompute metrics and heatmap responses for the current data.
+    
+    Fills METRICS_CACHE and RESPONSE_CACHE with what /api/metrics (every
+    WARMUP_DURATIONS), /api/heatmap_data (every index, mode and timeline over
+    the full history), per-index /api/heatmap_batch and the batch queries
+    recently seen (such as the heatmap page's category batches, any
+    duration) will look up. A batch query this process has never seen is
+    still computed on its first request.
+    
+    RESPONSE_CACHE is first grown to fit all of it, so the warm-up does not
+    evict its own entries on a large universe.
+    """
+    snapshot = PRICE_STORE.snapshot()
+    modes, timelines = list(HEATMAP_MODES), list(HEATMAP_TIMELINES)
+    per_index = 1 + len(modes) * len(timelines)
+    warmed = len(WARMUP_DURATIONS) + len(snapshot.frame.columns) * per_index + RECENT_BATCHES_MAX
+    RESPONSE_CACHE.maxsize = max(RESPONSE_CACHE.maxsize, warmed + RESPONSE_CACHE_HEADROOM)
+    
+    with app.app_context():
+        for duration in WARMUP_DURATIONS:
+            serialized_json(metrics_response_key(duration), lambda: calculate_metrics(duration))
         
-        cagr = None
-        if n_years > 0 and p_start > 0:
-            cagr = float((p_end / p_start) ** (1.0 / n_years) - 1.0)
+        for index_name in snapshot.frame.columns:
+            # One computation serves the batch and all its /api/heatmap_data responses
+            body = build_heatmap_batch(snapshot, [index_name], 'all', modes, timelines)
+            key = heatmap_batch_key(snapshot, [index_name], 'all', modes, timelines)
+            serialized_json(key, lambda: body)
+            for mode, grids in body["heatmaps"].get(index_name, {}).items():
+                for timeline, payload in grids.items():
+                    key = heatmap_data_key(snapshot, index_name, 0, mode, float(timeline))
+                    serialized_json(key, lambda: payload)
         
-        # Volatility
-        daily_returns = prices.pct_change().dropna()
-        daily_vol = daily_returns.std(ddof=1)
-        annual_vol = float(daily_vol * np.sqrt(252)) if np.isfinite(daily_vol) else None
-    
-    # Latest values
-    current_price = float(prices.iloc[-1]) if len(prices) > 0 else None
-    
-    # Get latest return from heatmap data
-    latest_return = None
-    if len(heatmap_data) > 0:
-        latest_year = str(max([int(y) for y in heatmap_data.keys()]))
-        if latest_year in heatmap_data:
-            latest_months = [m for m in heatmap_data[latest_year].values() if m is not None]
-            if latest_months:
-                latest_return = latest_months[-1]
-    
-    result = {
-        "indexName": index_name,
-        "heatmapData": heatmap_data,
-        "cagr": cagr,
-        "volatility": annual_vol,
-        "risk": annual_vol,
-        "currentPrice": current_price,
-        "latestReturn": latest_return,
-        "mode": mode,
-        "timeline": timeline
-    }
-    
-    print(f"DEBUG: Returning heatmap for {index_name}, mode: {mode}, timeline: {timeline}yrs, years: {sorted(heatmap_data.keys())}")
-    
-    response = jsonify(result)
-    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '0'
-    return response
+        with _RECENT_BATCHES_LOCK:
+            queries = list(_RECENT_BATCHES)
+        for index_names, duration, batch_modes, batch_timelines in queries:
+            key = heatmap_batch_key(snapshot, index_names, duration, batch_modes, batch_timelines)
+            serialized_json(key, lambda: build_heatmap_batch(
+                snapshot, list(index_names), duration, list(batch_modes), list(batch_timelines)
+            ))
+
+def _warmup_loop():
+    """Warm the caches now and again whenever data.csv or the Excel file changes"""
+    warmed = None
+    while True:
+        version = (PRICE_STORE.fingerprint(), file_fingerprint(V1_XLSX_PATH))
+        if version != warmed:
+            try:
+                warm_caches()
+                warmed = version
+            except Exception as e:
+                logger.exception("Cache warm-up failed: %s", e)
+        time.sleep(WARMUP_POLL_SECONDS)
+
+_WARMUP_THREAD = None
+
+def start_warmup():
+    """Start the background warm-up thread (once per process)"""
+    global _WARMUP_THREAD
+    if _WARMUP_THREAD is None:
+        _WARMUP_THREAD = threading.Thread(target=_warmup_loop, name="cache-warmup", daemon=True)
+        _WARMUP_THREAD.start()
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
+    # With the debug reloader only the serving child process needs warm caches
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_warmup()
     app.run(host="0.0.0.0", port=port, debug=True)
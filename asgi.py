@@ -0,0 +1,186 @@
+"""ASGI entry point: /api/metrics and /api/heatmap_data served from an async server
+
+Run with:
+    uvicorn asgi:app --host 127.0.0.1 --port 8000 --workers 2
+
+Both endpoints compute in a bounded thread pool (RISKAPP_COMPUTE_THREADS,
+default 4) so the event loop keeps accepting requests while a heatmap is being
+built, and concurrent identical requests share one computation (single-flight)
+instead of each occupying a thread. Every other route is handed to the Flask
+app unchanged.
+"""
+
+import asyncio
+import contextvars
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.http import parse_accept_header, parse_etags
+
+from app import (ApiError, PRICE_STORE, app as flask_app, calculate_metrics, metrics_response_key,
+                 metrics_window, prepare_heatmap_data, serialized_json, start_warmup)
+from riskapp.cache import SerializedBody
+from riskapp.timing import TIMER, server_timing
+
+COMPUTE_THREADS = int(os.environ.get("RISKAPP_COMPUTE_THREADS", 4))
+
+# Bounded pool for the CPU-bound work; NumPy releases the GIL in the heavy parts
+EXECUTOR = ThreadPoolExecutor(max_workers=COMPUTE_THREADS, thread_name_prefix="riskapp-compute")
+
+# Request key -> future of the computation serving it (one event loop per process)
+_IN_FLIGHT = {}
+
+
+async def single_flight(key, compute):
+    """
+    Run compute() in EXECUTOR, sharing one run between concurrent callers of a key
+
+    Args:
+        key: Hashable request key, including the version of the input data
+        compute: Zero-argument callable (runs in the caller's context copy)
+
+    Returns:
+        compute()'s result (the same object for every caller of one run)
+    """
+    future = _IN_FLIGHT.get(key)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(EXECUTOR, contextvars.copy_context().run, compute)
+        _IN_FLIGHT[key] = future
+        future.add_done_callback(lambda _: _IN_FLIGHT.pop(key, None))
+    # A cancelled (disconnected) caller must not cancel the shared computation
+    return await asyncio.shield(future)
+
+
+def _metrics_body(duration, window):
+    with flask_app.app_context():
+        return 200, serialized_json(metrics_response_key(duration, window),
+                                    lambda: calculate_metrics(duration, window))
+
+
+def _heatmap_body(index_name, duration, mode, timeline):
+    with flask_app.app_context():
+        try:
+            key, build = prepare_heatmap_data(index_name, duration, mode, timeline)
+        except ApiError as e:
+            return e.status, _error_body(e.message)
+        return 200, serialized_json(key, build)
+
+
+def _error_body(message):
+    return flask_app.json.dumps({"error": message}).encode()
+
+
+def _json_response(status, body, headers):
+    """
+    Status, headers and body for an encoded JSON result
+
+    SerializedBody results get the same ETag/304/gzip handling as the Flask
+    app's cached_json_response; plain bytes are sent as they are.
+    """
+    if not isinstance(body, SerializedBody):
+        return status, [(b'content-type', b'application/json')], body
+
+    serialized = body
+    accept = parse_accept_header(headers.get(b'accept-encoding', b'').decode('latin-1'))
+    use_gzip = serialized.gzip_body is not None and accept['gzip'] > 0
+    etag = serialized.gzip_etag if use_gzip else serialized.etag
+
+    if_none_match = parse_etags(headers.get(b'if-none-match', b'').decode('latin-1') or None)
+    response_headers = [(b'etag', f'"{etag}"'.encode()), (b'cache-control', b'no-cache')]
+    if serialized.gzip_body is not None:
+        response_headers.append((b'vary', b'Accept-Encoding'))
+
+    if if_none_match.contains_weak(serialized.etag) or if_none_match.contains_weak(serialized.gzip_etag):
+        return 304, response_headers, b''
+
+    response_headers.append((b'content-type', b'application/json'))
+    if use_gzip:
+        response_headers.append((b'content-encoding', b'gzip'))
+        return status, response_headers, serialized.gzip_body
+    return status, response_headers, serialized.body
+
+
+async def _api_metrics(query):
+    duration = query.get('duration', 'all')
+    try:
+        window = metrics_window(duration, query.get('start'), query.get('end'), query.get('as_of'))
+    except ValueError as e:
+        return 400, _error_body(str(e))
+    return await single_flight(metrics_response_key(duration, window), lambda: _metrics_body(duration, window))
+
+
+async def _api_heatmap_data(query):
+    index_name = query.get('index')
+    duration = query.get('duration', 'all')
+    mode = query.get('mode', 'trailing')
+    try:
+        timeline = float(query.get('timeline', '3'))
+    except ValueError:
+        return 400, _error_body("Invalid timeline")
+    key = ('heatmap_data', PRICE_STORE.fingerprint(), index_name, duration, mode, timeline)
+    return await single_flight(key, lambda: _heatmap_body(index_name, duration, mode, timeline))
+
+
+# Path -> (endpoint name as in the Flask app, handler)
+ROUTES = {
+    '/api/metrics': ('api_metrics', _api_metrics),
+    '/api/heatmap_data': ('api_heatmap_data', _api_heatmap_data),
+}
+
+
+class RiskRewardASGI:
+    """Serves ROUTES natively and everything else through the Flask WSGI app"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi = WsgiToAsgi(wsgi_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        route = ROUTES.get(scope['path']) if scope['type'] == 'http' and scope['method'] == 'GET' else None
+        if route is None:
+            return await self.wsgi(scope, receive, send)
+
+        endpoint, handler = route
+        # First value of every query arg, like request.args.get
+        query = {name: values[0] for name, values in
+                 parse_qs(scope['query_string'].decode('latin-1'), keep_blank_values=True).items()}
+        headers = dict(scope['headers'])
+
+        token, start = TIMER.begin(endpoint), time.perf_counter()
+        try:
+            status, body = await handler(query)
+        finally:
+            total = time.perf_counter() - start
+            TIMER.observe('total', total)
+            stages = TIMER.end(token) + [('total', total)]
+
+        status, response_headers, payload = _json_response(status, body, headers)
+        response_headers.append((b'server-timing', server_timing(stages).encode()))
+        response_headers.append((b'content-length', str(len(payload)).encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Same background cache warm-up as the Gunicorn workers
+                start_warmup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if sys.version_info >= (3, 9):
+                    EXECUTOR.shutdown(wait=False, cancel_futures=True)
+                else:
+                    EXECUTOR.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = RiskRewardASGI(flask_app)
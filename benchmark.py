@@ -0,0 +1,165 @@
+"""Benchmark the metrics and heatmap hot paths on synthetic data
+
+Usage:
+    python benchmark.py                      # run and compare with benchmark_baseline.json
+    python benchmark.py --update-baseline    # run and record a new baseline
+    python benchmark.py --indices 2000 --years 25 --missing 0.05
+
+Exits with status 1 when a case is slower than its baseline by more than
+--threshold (default 25%) and --min-delta seconds.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from riskapp.synthetic import make_price_panel, write_price_csv
+
+DURATIONS = ('all', '3years', '5years')
+
+
+def best_time(func, repeat):
+    """Fastest of `repeat` runs, in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_cases(csv_path, repeat):
+    """Time every hot path against the CSV at csv_path"""
+    # app.py reads its data file location at import time
+    os.environ["RISKAPP_CSV_PATH"] = csv_path
+    import app
+    from riskapp import RiskRewardAPI
+    from riskapp.engine import duration_start
+    from riskapp.heatmap import HEATMAP_MODES, HEATMAP_TIMELINES, build_monthly_panel, heatmap_payloads
+    from riskapp.store import load_price_frame, read_price_csv
+
+    api = RiskRewardAPI(csv_path=csv_path)
+    results = {}
+
+    results['read_price_csv'] = best_time(lambda: read_price_csv(csv_path), repeat)
+    load_price_frame(csv_path)  # make sure the sidecar exists
+    results['load_price_frame_sidecar'] = best_time(lambda: load_price_frame(csv_path, mmap=True), repeat)
+
+    def cold_load_data():
+        # A real load from the sidecar every run, not a cached store lookup
+        api._store.clear()
+        api.load_data()
+
+    results['load_data_cold'] = best_time(cold_load_data, repeat)
+
+    def uncached_get_metrics(duration):
+        api._metrics_cache.clear()
+        api.get_metrics(duration)
+
+    def uncached_calculate_metrics(duration):
+        app.METRICS_CACHE.clear()
+        app.calculate_metrics(duration)
+
+    for duration in DURATIONS:
+        results[f'get_metrics[{duration}]'] = best_time(lambda: uncached_get_metrics(duration), repeat)
+        results[f'get_metrics_cached[{duration}]'] = best_time(lambda: api.get_metrics(duration), repeat)
+        results[f'calculate_metrics[{duration}]'] = best_time(lambda: uncached_calculate_metrics(duration), repeat)
+
+    frame = api.load_data()
+    columns = list(frame.columns)
+    modes, timelines = list(HEATMAP_MODES), list(HEATMAP_TIMELINES)
+    start_row = duration_start(frame.index, 'all')
+    results['build_monthly_panel'] = best_time(lambda: build_monthly_panel(frame), repeat)
+    panel = build_monthly_panel(frame)
+    results['heatmap_one_index'] = best_time(
+        lambda: heatmap_payloads(frame, panel, columns[:1], start_row, ['3'], ['trailing']), repeat
+    )
+    results['heatmap_all_indices'] = best_time(
+        lambda: heatmap_payloads(frame, panel, columns, start_row, timelines, modes), repeat
+    )
+    return results
+
+
+def compare(results, baseline, threshold, min_delta):
+    """Print each case against the baseline; return the names that regressed"""
+    regressions = []
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<36} {seconds * 1000:10.2f} ms   (new)")
+            continue
+        change = seconds / base - 1 if base > 0 else 0.0
+        flag = ''
+        # Sub-millisecond cases are too noisy to fail on relative change alone
+        if change > threshold and seconds - base > min_delta:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<36} {seconds * 1000:10.2f} ms   baseline {base * 1000:10.2f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the metrics and heatmap hot paths")
+    parser.add_argument("--indices", type=int, default=130, help="Number of synthetic indices")
+    parser.add_argument("--years", type=float, default=20, help="Years of daily history")
+    parser.add_argument("--missing", type=float, default=0.02, help="Fraction of missing prices")
+    parser.add_argument("--no-stagger", action="store_true", help="Start every index on the first date")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case (best is kept)")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Record this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=0.002,
+                        help="Ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args()
+
+    config = {
+        'indices': args.indices,
+        'years': args.years,
+        'missing': args.missing,
+        'staggered': not args.no_stagger,
+        'seed': args.seed,
+    }
+    frame = make_price_panel(args.indices, args.years, args.missing, not args.no_stagger, seed=args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'data.csv')
+        write_price_csv(frame, csv_path)
+        print(f"Synthetic panel: {frame.shape[0]} dates x {frame.shape[1]} indices")
+        results = run_cases(csv_path, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            recorded = json.load(f)
+        if recorded.get('config') != config:
+            print(f"Warning: {args.baseline} was recorded with {recorded.get('config')}, not comparing")
+        else:
+            baseline = recorded['results']
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta)
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'config': config,
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'pandas': pd.__version__,
+                'results': results,
+            }, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Benchmark parallel metric computation on a wide synthetic universe"""
+import argparse
+import os
+
+from benchmark import best_time
+from riskapp.engine import compute_panel_metrics
+from riskapp.parallel import ParallelPanelEngine
+from riskapp.synthetic import make_price_panel
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--indices", type=int, default=4000)
+    parser.add_argument("--years", type=float, default=15)
+    parser.add_argument("--duration", default="all")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frame = make_price_panel(args.indices, args.years)
+    print(f"Panel: {frame.shape[0]} dates x {frame.shape[1]} indices, {os.cpu_count()} CPUs")
+
+    serial = best_time(lambda: compute_panel_metrics(frame, args.duration), args.repeat)
+    print(f"{'serial':>10}: {serial:8.3f}s")
+
+    worker_counts = sorted({w for w in (2, 4, 8, 16, os.cpu_count() or 1) if w <= (os.cpu_count() or 1)})
+    for workers in worker_counts:
+        engine = ParallelPanelEngine(workers, min_columns_per_shard=1)
+        try:
+            engine.compute(frame, args.duration, key='bench')  # start workers, share matrix
+            elapsed = best_time(lambda: engine.compute(frame, args.duration, key='bench'), args.repeat)
+        finally:
+            engine.close()
+        print(f"{workers:>2} workers: {elapsed:8.3f}s  speedup {serial / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
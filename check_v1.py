@@ -1,16 +1,15 @@
 """Check V1 calculation step by step"""
 
-import pandas as pd
 import urllib.request
 import json
 
+from riskapp.priceindex import PriceIndex
+from riskapp.store import load_price_frame
+
 CSV_PATH = r'd:\Risk reward - Copy\data.csv'
 
-# Load data
-df = pd.read_csv(CSV_PATH)
-df['DATE'] = pd.to_datetime(df['DATE'], format='%d/%m/%y', errors='coerce')
-df = df.dropna(subset=['DATE']).sort_values('DATE')
-df = df.set_index('DATE')
+# Load data (from the binary sidecar when it is current)
+df = load_price_frame(CSV_PATH)
 
 print("="*80)
 print("STEP-BY-STEP V1 CALCULATION VERIFICATION")
@@ -19,21 +18,22 @@ print("="*80)
 # Test with a few indices
 test_indices = ['N50', 'NMC50', 'NIDEF', 'NMEDIA', 'NBANK']
 
+# Latest price and last price 5 years before it: binary searches, no filtering
+price_index = PriceIndex(df)
+latest_rows, past_rows = price_index.lookback_rows(5, columns=test_indices)
+
 manual_results = []
 
-for col in test_indices:
-    prices = df[col].astype(float).dropna()
-    
-    latest_date = prices.index.max()
-    latest_value = prices.iloc[-1]
+for col, latest_row, past_row in zip(test_indices, latest_rows, past_rows):
+    if latest_row < 0:
+        continue
+    latest_date = df.index[latest_row]
+    latest_value = float(df[col].iloc[latest_row])
     
     # Find value 5 years ago
-    target_date_5y_ago = latest_date - pd.DateOffset(years=5)
-    dates_before_target = prices.index[prices.index <= target_date_5y_ago]
-    
-    if len(dates_before_target) > 0:
-        closest_date_5y_ago = dates_before_target[-1]
-        value_5y_ago = prices.loc[closest_date_5y_ago]
+    if past_row >= 0:
+        closest_date_5y_ago = df.index[past_row]
+        value_5y_ago = float(df[col].iloc[past_row])
         
         # CAGR = (FV/PV)^(1/5) - 1
         cagr_5y = ((latest_value / value_5y_ago) ** (1.0 / 5.0) - 1.0) * 100
@@ -2,22 +2,16 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from riskapp.ranking import percentile_ranks
+from riskapp.store import load_price_frame
+
 CSV_PATH = "data.csv"
 OUTPUT_FILE = f"RMom_Export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
 
 def calculate_metrics_with_rmom():
     """Calculate metrics including RMom for all indices"""
-    df = pd.read_csv(CSV_PATH)
-    
-    if "DATE" not in df.columns:
-        raise ValueError("Expected a 'DATE' column in the CSV.")
-    
-    # Parse DATE and sort
-    df["DATE"] = pd.to_datetime(df["DATE"], format='%d/%m/%y', errors="coerce")
-    df = df.dropna(subset=["DATE"]).sort_values("DATE")
-    
-    # Set DATE as index
-    df = df.set_index("DATE")
+    # DATE-indexed prices (read from the binary sidecar when it is current)
+    df = load_price_frame(CSV_PATH)
     
     # All remaining columns are index price series
     price_cols = df.columns
@@ -86,22 +80,14 @@ def calculate_metrics_with_rmom():
             "Momentum_12m_raw": momentum_12m  # Store raw value for RMom calculation
         })
     
-    # Calculate Relative Momentum (RMom) as percentile rank
-    valid_momentum_data = [(i, r['Momentum_12m_raw']) for i, r in enumerate(results) if r['Momentum_12m_raw'] is not None]
-    
-    if len(valid_momentum_data) > 1:
-        # Sort by momentum value to get rankings
-        sorted_momentum = sorted(valid_momentum_data, key=lambda x: x[1])
-        
-        # Assign percentile rank (0-100 scale)
-        for rank, (original_idx, momentum_value) in enumerate(sorted_momentum):
-            n = len(sorted_momentum)
-            if n > 1:
-                percentile = (rank / (n - 1)) * 100
-            else:
-                percentile = 50
-            
-            results[original_idx]['RMom'] = round(percentile, 1)
+    # Calculate Relative Momentum (RMom) as percentile rank (0-100 scale)
+    momentum = np.array(
+        [np.nan if r['Momentum_12m_raw'] is None else r['Momentum_12m_raw'] for r in results], dtype=float
+    )
+    if np.count_nonzero(~np.isnan(momentum)) > 1:
+        for result, percentile in zip(results, percentile_ranks(momentum, ties='ordinal')):
+            if not np.isnan(percentile):
+                result['RMom'] = round(float(percentile), 1)
     else:
         for result in results:
             result['RMom'] = None
@@ -1,5 +1,30 @@
 # Gunicorn configuration file
+import os
+
 bind = "127.0.0.1:8000"
-workers = 2
+# Workers share one page-cache copy of the prices through the memory-mapped
+# data.csv.panel sidecar, so adding workers costs little extra memory
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
 threads = 2
 timeout = 120
+
+
+def on_starting(server):
+    """Build the binary price sidecar once in the master, before any worker maps it"""
+    from riskapp.store import load_price_frame
+
+    # Same resolution as app.CSV_PATH (importing app here would load the data in the master)
+    csv_path = os.environ.get(
+        "RISKAPP_CSV_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.csv")
+    )
+    try:
+        load_price_frame(csv_path, mmap=True)
+    except (OSError, ValueError) as e:
+        server.log.warning(f"Could not prepare price sidecar: {e}")
+
+
+def post_fork(server, worker):
+    """Warm metrics and heatmap caches in the background in every worker"""
+    from app import start_warmup
+
+    start_warmup()
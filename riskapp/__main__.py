@@ -0,0 +1,51 @@
+"""Command line tools for the price data
+
+Usage:
+    python -m riskapp convert path/to/data.csv
+    python -m riskapp append path/to/data.csv path/to/new_rows.csv
+    python -m riskapp v1 path/to/data.csv ["path/to/heatmap values.xlsx"]
+"""
+
+import argparse
+
+from .store import append_price_rows, convert_csv, load_price_frame, read_price_csv
+from .v1 import compute_v1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m riskapp")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="Write the binary sidecar for a price CSV")
+    convert.add_argument("csv_path", help="Path to data.csv")
+
+    append = commands.add_parser("append", help="Append new trading days to a price CSV and its sidecar")
+    append.add_argument("csv_path", help="Path to data.csv")
+    append.add_argument("rows_path", help="CSV of new rows with a DATE column (dd/mm/yy) and index columns")
+
+    v1 = commands.add_parser("v1", help="Compute V1 from a price CSV, optionally reconciled with the workbook")
+    v1.add_argument("csv_path", help="Path to data.csv")
+    v1.add_argument("excel_path", nargs="?", help="heatmap values.xlsx to compare against")
+    v1.add_argument("--tolerance", type=float, default=0.05, help="Largest difference that counts as a match")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        print(f"Wrote {convert_csv(args.csv_path)}")
+    elif args.command == "append":
+        appended = append_price_rows(args.csv_path, read_price_csv(args.rows_path))
+        print(f"Appended {len(appended)} rows to {args.csv_path}")
+    elif args.command == "v1":
+        if args.excel_path:
+            from .metrics import RiskRewardAPI
+
+            api = RiskRewardAPI(csv_path=args.csv_path, excel_path=args.excel_path)
+            table = api.get_v1_reconciliation(args.tolerance)
+            print(table.to_string())
+            print(f"{int(table['match'].sum())} of {len(table)} within {args.tolerance}")
+        else:
+            print(compute_v1(load_price_frame(args.csv_path)).sort_values('v1', ascending=False).to_string())
+
+
+if __name__ == "__main__":
+    main()
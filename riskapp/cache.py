@@ -0,0 +1,193 @@
+"""Bounded LRU cache for computed metrics results and serialized responses"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+def file_fingerprint(path):
+    """
+    Cheap change marker for a file
+
+    Args:
+        path: File path
+
+    Returns:
+        (mtime_ns, size) tuple, or None if the file does not exist
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class _Call:
+    """One in-progress computation of a SingleFlight key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time; concurrent callers share its result"""
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute):
+        """
+        Return compute() for key, or wait for the call already computing it
+
+        Args:
+            key: Hashable key identifying the computation (including the
+                version of its inputs)
+            compute: Zero-argument callable; must not call do() for the same key
+
+        Returns:
+            The value computed by whichever caller ran first (an exception it
+            raised is raised in every waiting caller)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = compute()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Later callers start a fresh computation (e.g. retry after an error)
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with hit/miss counters"""
+
+    def __init__(self, maxsize=32):
+        """
+        Args:
+            maxsize: Maximum number of entries kept before the oldest is evicted
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def get(self, key, default=None):
+        """Return the cached value for key (counting a hit or miss)"""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss
+
+        Concurrent misses of the same key wait for one computation instead of
+        each running compute().
+
+        Args:
+            key: Hashable cache key
+            compute: Zero-argument callable producing the value
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._flight.do(key, lambda: self._fill(key, compute))
+        return value
+
+    def _fill(self, key, compute):
+        """Compute and store a value unless a call that just finished already did"""
+        with self._lock:
+            if key in self._data:
+                return self._data[key]
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self._flight.shared = 0
+
+    def stats(self):
+        """
+        Returns:
+            Dictionary with hits, misses, coalesced (misses that waited for
+            another caller's computation), size and maxsize
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self._flight.shared,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SerializedBody:
+    """A response body encoded once: raw bytes, optional gzip bytes and a strong ETag"""
+
+    def __init__(self, body, compress_min_size=1024):
+        """
+        Args:
+            body: Encoded response body (bytes)
+            compress_min_size: Also keep a gzip copy when the body is at least
+                this many bytes (None disables compression)
+        """
+        self.body = body
+        # Hash of the content, so every worker derives the same tag for the
+        # same data version without sharing state
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.gzip_body = None
+        if compress_min_size is not None and len(body) >= compress_min_size:
+            self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0)
+
+    @property
+    def gzip_etag(self):
+        """ETag of the gzip-encoded variant (a different representation)"""
+        return self.etag + '-gzip'
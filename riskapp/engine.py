@@ -0,0 +1,386 @@
+"""Vectorized whole-panel metrics engine
+
+Every function here works on the full (dates x indices) price matrix at once,
+treating each column's own first/last valid observation the same way the
+original per-column ``dropna()`` loop did.
+"""
+
+import numpy as np
+import pandas as pd
+
+NS_PER_DAY = 86400 * 10**9
+
+METRIC_NAMES = (
+    'cagr',
+    'annual_vol',
+    'momentum_12m',
+    'cagr_3y',
+    'cumulative_5y',
+    'avg_monthly_profit_4y',
+)
+
+DURATION_YEARS = {
+    '1year': 1,
+    '3years': 3,
+    '5years': 5,
+}
+
+
+def duration_start(dates, duration='all'):
+    """
+    Row position where a duration window starts
+
+    Args:
+        dates: Sorted DatetimeIndex
+        duration: '1year', '3years', '5years' or 'all'
+
+    Returns:
+        First row on or after (last date - duration); 0 for 'all'
+    """
+    years = DURATION_YEARS.get(duration)
+    if years is None or len(dates) == 0:
+        return 0
+    cutoff_date = dates.max() - pd.DateOffset(years=years)
+    return int(dates.searchsorted(cutoff_date, side='left'))
+
+
+def filter_duration(frame, duration='all'):
+    """
+    Keep only the rows inside the requested duration window
+
+    Args:
+        frame: DATE-indexed price DataFrame
+        duration: '1year', '3years', '5years' or 'all'
+
+    Returns:
+        Filtered DataFrame ('all' returns the frame unchanged)
+    """
+    start = duration_start(frame.index, duration)
+    return frame.iloc[start:] if start else frame
+
+
+def _ffill_positions(valid):
+    """Row position of the last valid value at or before each row (-1 if none)"""
+    rows = np.arange(valid.shape[0])[:, None]
+    return np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+
+
+def _first_last(valid):
+    """Row positions of each column's first and last valid value"""
+    first = valid.argmax(axis=0)
+    last = valid.shape[0] - 1 - valid[::-1].argmax(axis=0)
+    return first, last
+
+
+def _take(values, rows):
+    """values[rows[j], j] for every column j, NaN where rows[j] < 0"""
+    cols = np.arange(values.shape[1])
+    out = values[np.maximum(rows, 0), cols]
+    return np.where(rows >= 0, out, np.nan)
+
+
+def _take_matrix(values, positions):
+    """values[positions[t, j], j] for every cell, NaN where positions < 0"""
+    cols = np.arange(values.shape[1])[None, :]
+    out = values[np.maximum(positions, 0), cols]
+    return np.where(positions >= 0, out, np.nan)
+
+
+def _step_returns(values):
+    """
+    Simple returns between consecutive valid observations of each column
+
+    Equivalent to ``series.dropna().pct_change()`` per column, laid out on the
+    original rows (NaN where a column has no observation or no predecessor).
+    """
+    valid = ~np.isnan(values)
+    prev = _take_matrix(values, _ffill_positions(valid))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[1:] / prev[:-1] - 1.0
+    return returns
+
+
+def _offset_dates(dates, years):
+    """Subtract a calendar DateOffset of `years` from an array of datetime64 values"""
+    return (pd.DatetimeIndex(dates) - pd.DateOffset(years=years)).values
+
+
+def _nanstd(values, ddof=1):
+    """Column-wise std over non-NaN values, NaN where there are too few of them"""
+    count = (~np.isnan(values)).sum(axis=0)
+    out = np.full(values.shape[1], np.nan)
+    ok = count > ddof
+    if ok.any():
+        with np.errstate(invalid='ignore'):
+            out[ok] = np.nanstd(values[:, ok], axis=0, ddof=ddof)
+    return out
+
+
+def window_cagr(values, dates, positive_start=False):
+    """
+    CAGR between each column's first and last valid observation
+
+    Args:
+        values: (dates x indices) float matrix
+        dates: datetime64[ns] array aligned with the rows
+        positive_start: Require a start price > 0 instead of just non-zero
+
+    Returns:
+        Tuple (cagr, n_days, count) of per-column arrays; cagr is NaN where
+        there are fewer than two points, no elapsed days, a zero start price
+        or a non-finite result
+    """
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    n = values.shape[1]
+    if values.shape[0] == 0:
+        return np.full(n, np.nan), np.zeros(n, dtype=np.int64), count
+
+    first, last = _first_last(valid)
+    p_start = _take(values, np.where(count > 0, first, -1))
+    p_end = _take(values, np.where(count > 0, last, -1))
+    day_num = dates.astype('datetime64[ns]').view('i8') // NS_PER_DAY
+    n_days = np.where(count > 0, day_num[last] - day_num[first], 0)
+
+    with np.errstate(invalid='ignore'):
+        start_ok = p_start > 0 if positive_start else p_start != 0
+    ok = (count >= 2) & (n_days > 0) & start_ok
+    cagr = np.full(n, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        n_years = n_days[ok] / 365.0
+        cagr[ok] = (p_end[ok] / p_start[ok]) ** (1.0 / n_years) - 1.0
+    cagr[~np.isfinite(cagr)] = np.nan
+    return cagr, n_days, count
+
+
+def trailing_window_stats(values, dates, days=None):
+    """
+    CAGR and annualized volatility over each column's last `days` calendar days
+
+    Args:
+        values: (dates x indices) float matrix
+        dates: datetime64[ns] array aligned with the rows
+        days: Window length counted back from each column's last valid date;
+            None uses every row
+
+    Returns:
+        Tuple (cagr, annual_vol, last_price) of per-column arrays (NaN where
+        unavailable); CAGR needs a positive start price
+    """
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    n = values.shape[1]
+    if values.shape[0] == 0:
+        return np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+
+    _, last = _first_last(valid)
+    last_price = _take(values, np.where(count > 0, last, -1))
+    if days is not None:
+        day_num = dates.astype('datetime64[ns]').view('i8') // NS_PER_DAY
+        cut_row = np.searchsorted(day_num, day_num[last] - days, side='left')
+        rows = np.arange(values.shape[0])[:, None]
+        values = np.where(rows >= cut_row[None, :], values, np.nan)
+
+    cagr, _, _ = window_cagr(values, dates, positive_start=True)
+    annual_vol = _nanstd(_step_returns(values), ddof=1) * np.sqrt(252)
+    annual_vol[~np.isfinite(annual_vol)] = np.nan
+    return cagr, annual_vol, last_price
+
+
+def month_end_panel(values, dates):
+    """
+    Month-end resample of a price matrix (last valid price in each calendar month)
+
+    Args:
+        values: (dates x indices) float matrix
+        dates: datetime64[ns] array aligned with the rows
+
+    Returns:
+        Tuple (month_ends, prices, positions): month-end datetime64 labels,
+        (months x indices) prices with NaN for months without data, and the
+        source row of each price (-1 where missing)
+    """
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    months = dates.astype('datetime64[M]')
+    if len(months) == 0:
+        empty = np.empty((0, values.shape[1]))
+        return months.astype('datetime64[ns]'), empty, empty.astype(np.int64)
+
+    # Every calendar month between the first and last date, like resample('M')
+    all_months = np.arange(months[0], months[-1] + 1)
+    # Last row that falls in (or before) each month
+    month_last_row = np.searchsorted(months, all_months, side='right') - 1
+    month_first_row = np.searchsorted(months, all_months, side='left')
+
+    positions = _ffill_positions(~np.isnan(values))[month_last_row]
+    positions = np.where(positions >= month_first_row[:, None], positions, -1)
+    prices = _take_matrix(values, positions)
+
+    month_ends = ((all_months + 1).astype('datetime64[D]') - 1).astype('datetime64[ns]')
+    return month_ends, prices, positions
+
+
+def _avg_monthly_profit(values, dates, last, count, years):
+    """Mean month-over-month return (%) over each column's trailing `years`"""
+    n = values.shape[1]
+    out = np.full(n, np.nan)
+    has_data = count > 0
+    if not has_data.any():
+        return out
+
+    cutoff = _offset_dates(dates[last[has_data]], years)
+    cut_row = np.zeros(n, dtype=np.int64)
+    cut_row[has_data] = np.searchsorted(dates, cutoff, side='left')
+    cut_row[~has_data] = values.shape[0]
+
+    _, prices, positions = month_end_panel(values, dates)
+    prices = np.where(positions >= cut_row[None, :], prices, np.nan)
+    monthly_returns = _step_returns(prices) * 100
+
+    n_returns = (~np.isnan(monthly_returns)).sum(axis=0)
+    ok = n_returns > 0
+    if ok.any():
+        with np.errstate(invalid='ignore'):
+            out[ok] = np.nansum(monthly_returns[:, ok], axis=0) / n_returns[ok]
+    return out
+
+
+def trailing_return(values, dates, years):
+    """
+    % change of every column since its last price `years` before its own latest date
+
+    Args:
+        values: (dates x indices) float matrix
+        dates: datetime64[ns] array aligned with the rows
+        years: Calendar years to look back (pd.DateOffset)
+
+    Returns:
+        Per-column array, NaN where a column has no price that far back or the
+        past price is not positive
+    """
+    n = values.shape[1]
+    obs = ~np.isnan(values)
+    count = obs.sum(axis=0)
+    _, last = _first_last(obs)
+    out = np.full(n, np.nan)
+    has_data = count > 0
+    if has_data.any():
+        latest_value = _take(values, np.where(has_data, last, -1))
+        target = _offset_dates(dates[last[has_data]], years)
+        target_row = np.full(n, -1)
+        target_row[has_data] = np.searchsorted(dates, target, side='right') - 1
+        ffill = _ffill_positions(obs)
+        cols = np.arange(n)
+        past_row = np.where(target_row >= 0, ffill[np.maximum(target_row, 0), cols], -1)
+        past_value = _take(values, past_row)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = np.where(past_value > 0, ((latest_value / past_value) - 1.0) * 100, np.nan)
+    return out
+
+
+def compute_panel_metrics(frame, duration='all', price_index=None, lookbacks=True):
+    """
+    Compute all per-index metrics for every column of a price panel in one pass
+
+    Args:
+        frame: DATE-indexed price DataFrame (sorted, float columns)
+        duration: '3years', '5years', or 'all' - window for CAGR, volatility and momentum
+        price_index: Optional PriceIndex of the full price frame (any superset
+            of frame's columns); the 5-year lookback then becomes a lookup
+        lookbacks: False skips cumulative_5y and avg_monthly_profit_4y
+            (left all NaN) for callers that don't report them
+
+    Returns:
+        Dict of NumPy arrays aligned with frame.columns (NaN where not available):
+            valid: True where the index passes the same checks as the per-column loop
+            cagr: CAGR over the duration window
+            annual_vol: annualized volatility of daily returns over the window
+            momentum_12m: % change over the last 252 observations (needs 252+ points)
+            cagr_3y: CAGR over the last 3 years of the full history
+            cumulative_5y: % change since the last price 5 years before the index's latest date
+            avg_monthly_profit_4y: mean monthly % return over the index's last 4 years
+    """
+    n = len(frame.columns)
+    if len(frame) == 0:
+        empty = {name: np.full(n, np.nan) for name in METRIC_NAMES}
+        empty['valid'] = np.zeros(n, dtype=bool)
+        return empty
+
+    all_values = frame.to_numpy(dtype=float)
+    all_dates = frame.index.values.astype('datetime64[ns]')
+
+    # The metrics endpoints only window on '3years'/'5years'; anything else is 'all'
+    start = 0
+    if duration in ('3years', '5years'):
+        start = duration_start(frame.index, duration)
+    values = all_values[start:]
+    dates = all_dates[start:]
+
+    # 1. Return (CAGR) over the duration window
+    cagr, _, count = window_cagr(values, dates)
+    valid = np.isfinite(cagr)
+
+    # 2. Volatility (annualized std of daily returns)
+    daily_returns = _step_returns(values)
+    annual_vol = _nanstd(daily_returns, ddof=1) * np.sqrt(252)
+    valid &= np.isfinite(annual_vol)
+
+    # 3. 12-month momentum: last price vs the 252nd-from-last observation
+    obs = ~np.isnan(values)
+    _, last = _first_last(obs)
+    p_end = _take(values, np.where(count > 0, last, -1))
+    momentum_12m = np.full(n, np.nan)
+    has_year = count >= 252
+    if has_year.any():
+        rank = np.cumsum(obs, axis=0)
+        hit = obs & (rank == (count - 251)[None, :])
+        p_12m_ago = _take(values, np.where(has_year, hit.argmax(axis=0), -1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            momentum_12m = np.where(
+                has_year & (p_12m_ago != 0),
+                (p_end - p_12m_ago) / p_12m_ago * 100,
+                np.nan,
+            )
+        momentum_12m[~np.isfinite(momentum_12m)] = np.nan
+
+    # 4. CAGR over the last 3 years of the full history
+    three_year_cutoff = frame.index.max() - pd.DateOffset(years=3)
+    three_year_start = np.searchsorted(all_dates, np.datetime64(three_year_cutoff, 'ns'), side='left')
+    cagr_3y, _, _ = window_cagr(
+        all_values[three_year_start:], all_dates[three_year_start:], positive_start=True
+    )
+
+    if not lookbacks:
+        missing = np.full(len(frame.columns), np.nan)
+        return {
+            'valid': valid,
+            'cagr': cagr,
+            'annual_vol': annual_vol,
+            'momentum_12m': momentum_12m,
+            'cagr_3y': cagr_3y,
+            'cumulative_5y': missing,
+            'avg_monthly_profit_4y': missing.copy(),
+        }
+
+    # 5. Cumulative 5-year return, anchored on each index's own latest date
+    if price_index is not None:
+        cumulative_5y = price_index.trailing_return(5, columns=frame.columns)
+    else:
+        cumulative_5y = trailing_return(all_values, all_dates, 5)
+    full_obs = ~np.isnan(all_values)
+    full_count = full_obs.sum(axis=0)
+    _, full_last = _first_last(full_obs)
+
+    # 6. Average monthly profit over the last 4 years
+    avg_monthly_profit_4y = _avg_monthly_profit(all_values, all_dates, full_last, full_count, 4)
+
+    return {
+        'valid': valid,
+        'cagr': cagr,
+        'annual_vol': annual_vol,
+        'momentum_12m': momentum_12m,
+        'cagr_3y': cagr_3y,
+        'cumulative_5y': cumulative_5y,
+        'avg_monthly_profit_4y': avg_monthly_profit_4y,
+    }
+
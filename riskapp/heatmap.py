@@ -0,0 +1,213 @@
+"""Month-end price panel and vectorized trailing/rolling return heatmaps"""
+
+import numpy as np
+
+from .engine import month_end_panel, trailing_window_stats
+
+HEATMAP_MODES = ('trailing', 'rolling')
+HEATMAP_TIMELINES = ('1', '3', '3.5', '4', '4.5', '5')
+
+
+class MonthlyPanel:
+    """Month-end prices for every index, built once per data version"""
+
+    def __init__(self, frame):
+        """
+        Args:
+            frame: DATE-indexed price DataFrame
+        """
+        dates = frame.index.values.astype('datetime64[ns]')
+        self.column_positions = {col: j for j, col in enumerate(frame.columns)}
+        self.month_ends, self.prices, self.positions = month_end_panel(
+            frame.to_numpy(dtype=float), dates
+        )
+
+        months = self.month_ends.astype('datetime64[M]').astype(np.int64)
+        self.years = months // 12 + 1970
+        self.months = months % 12 + 1
+        self.month_labels = np.array([str(m) for m in range(13)], dtype=object)[self.months]
+
+    def stack(self, columns, start_row=0):
+        """
+        Month-end prices of several indices laid end to end
+
+        Each column's part is ``prices.resample('M').last().dropna()`` of that
+        index, so shifting by k inside a part moves k available months.
+
+        Args:
+            columns: Index names
+            start_row: Only use daily prices from this row of the source frame on
+
+        Returns:
+            MonthlyStack
+        """
+        cols = [self.column_positions[col] for col in columns]
+        present = self.positions[:, cols] >= max(start_row, 0)
+        # Column-major order keeps each index's months together and sorted
+        part, rows = np.nonzero(present.T)
+        prices = self.prices[rows, np.asarray(cols, dtype=np.int64)[part]]
+        return MonthlyStack(self, list(columns), part, rows, prices)
+
+
+class MonthlyStack:
+    """Flattened month-end series of several indices (see MonthlyPanel.stack)"""
+
+    def __init__(self, panel, columns, part, rows, prices):
+        self.panel = panel
+        self.columns = columns
+        self.part = part
+        self.rows = rows
+        self.prices = prices
+        self.bounds = np.searchsorted(part, np.arange(len(columns) + 1))
+        # Position of every month inside its index's series, and that series' length
+        self.rank = np.arange(len(rows)) - self.bounds[part]
+        self.count = np.diff(self.bounds)[part]
+
+
+def build_monthly_panel(frame):
+    """Build a MonthlyPanel (for use with PriceSnapshot.derived)"""
+    return MonthlyPanel(frame)
+
+
+def annualized_returns(stack, lookback_months, timeline, mode='trailing'):
+    """
+    Annualized % return over `lookback_months` for every month of every index at once
+
+    Args:
+        stack: MonthlyStack
+        lookback_months: Number of available months between the two prices
+        timeline: Period length in years used for annualizing
+        mode: 'trailing' (look back from each month) or 'rolling' (look forward)
+
+    Returns:
+        Array aligned with stack.prices, NaN where there is not enough
+        history/future or the base price is not positive
+    """
+    exponent = 1.0 / timeline
+    out = np.full(len(stack.prices), np.nan)
+    if lookback_months < 0:
+        return out
+
+    idx = np.arange(len(stack.prices))
+    if mode == 'trailing':
+        at = idx[stack.rank >= lookback_months]
+        earlier, later = stack.prices[at - lookback_months], stack.prices[at]
+    else:
+        at = idx[stack.rank + lookback_months < stack.count]
+        earlier, later = stack.prices[at], stack.prices[at + lookback_months]
+
+    ok = earlier > 0
+    with np.errstate(invalid='ignore', over='ignore'):
+        out[at[ok]] = ((later[ok] / earlier[ok]) ** exponent - 1.0) * 100
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def build_heatmaps(stack, timeline, mode='trailing'):
+    """
+    Year -> month grids of trailing/rolling annualized returns for every index in a stack
+
+    Args:
+        stack: MonthlyStack
+        timeline: Period length in years (e.g. 1, 3, 3.5, 4, 4.5, 5)
+        mode: 'trailing' or 'rolling'
+
+    Returns:
+        Dictionary of index name -> (heatmap_data, latest_return), where
+        heatmap_data maps year -> month -> return (None where unavailable)
+    """
+    returns = annualized_returns(stack, int(timeline * 12), timeline, mode)
+
+    finite = np.isfinite(returns)
+    values = returns.astype(object)
+    values[~finite] = None
+    values = values.tolist()
+
+    years = stack.panel.years[stack.rows]
+    months = stack.panel.month_labels[stack.rows].tolist()
+
+    grids = {}
+    for k, column in enumerate(stack.columns):
+        a, b = stack.bounds[k], stack.bounds[k + 1]
+        heatmap_data = {}
+        latest_return = None
+        if b > a:
+            unique_years, starts = np.unique(years[a:b], return_index=True)
+            ends = list(starts[1:]) + [b - a]
+            for year, lo, hi in zip(unique_years, starts + a, np.asarray(ends) + a):
+                heatmap_data[str(year)] = dict(zip(months[lo:hi], values[lo:hi]))
+
+            # Latest available return in the most recent year
+            latest = np.flatnonzero(finite[a:b] & (years[a:b] == years[b - 1]))
+            if len(latest):
+                latest_return = values[a + latest[-1]]
+        grids[column] = (heatmap_data, latest_return)
+    return grids
+
+
+def build_heatmap(panel, column, start_row, timeline, mode='trailing'):
+    """
+    Year -> month grid of trailing/rolling annualized returns for one index
+
+    Returns:
+        Tuple (heatmap_data, latest_return)
+    """
+    return build_heatmaps(panel.stack([column], start_row), timeline, mode)[column]
+
+
+def heatmap_payloads(frame, panel, columns, start_row, timelines, modes):
+    """
+    API payloads for many indices, modes and timelines in one pass
+
+    Args:
+        frame: DATE-indexed price DataFrame the panel was built from
+        panel: MonthlyPanel
+        columns: Index names present in the frame
+        start_row: First daily row of the duration window
+        timelines: Timelines in years (strings or numbers)
+        modes: 'trailing' and/or 'rolling'
+
+    Returns:
+        Tuple (payloads, errors): payloads maps index -> mode -> timeline ->
+        the /api/heatmap_data response body; errors maps index -> message for
+        indices without enough data
+    """
+    window = frame[columns].iloc[start_row:]
+    values = window.to_numpy(dtype=float)
+    dates = window.index.values.astype('datetime64[ns]')
+
+    enough = (~np.isnan(values)).sum(axis=0) >= 2
+    errors = {col: "Insufficient data" for col, ok in zip(columns, enough) if not ok}
+    columns = [col for col, ok in zip(columns, enough) if ok]
+    values = values[:, enough]
+
+    payloads = {col: {mode: {} for mode in modes} for col in columns}
+    stack = panel.stack(columns, start_row)
+    for timeline_key in timelines:
+        timeline = float(timeline_key)
+
+        # Return/volatility over the last X years of each index (in days)
+        days = int(timeline * 365) if timeline > 0 else None
+        cagr, annual_vol, current_price = trailing_window_stats(values, dates, days)
+
+        for mode in modes:
+            grids = build_heatmaps(stack, timeline, mode)
+            for j, col in enumerate(columns):
+                heatmap_data, latest_return = grids[col]
+                payloads[col][mode][str(timeline_key)] = {
+                    "indexName": col,
+                    "heatmapData": heatmap_data,
+                    "cagr": _to_float(cagr[j]),
+                    "volatility": _to_float(annual_vol[j]),
+                    "risk": _to_float(annual_vol[j]),
+                    "currentPrice": _to_float(current_price[j]),
+                    "latestReturn": latest_return,
+                    "mode": mode,
+                    "timeline": timeline,
+                }
+    return payloads, errors
+
+
+def _to_float(value):
+    """NumPy scalar to JSON-safe float (None for NaN)"""
+    return None if np.isnan(value) else float(value)
@@ -0,0 +1,132 @@
+"""Ret, Risk, momentum and RMom as of every date in one vectorized pass"""
+
+import numpy as np
+
+from .engine import NS_PER_DAY, _ffill_positions
+from .ranking import percentile_ranks
+
+HISTORY_METRICS = ('Ret', 'Risk', 'Momentum_12m', 'RMom')
+HISTORY_FREQUENCIES = ('D', 'W', 'M', 'Y')
+
+
+def asof_rows(index, start=None, end=None, freq='D'):
+    """
+    Row positions of the as-of dates in a price frame
+
+    Args:
+        index: Sorted DatetimeIndex of the price frame
+        start: First as-of date (inclusive), None for the first row
+        end: Last as-of date (inclusive), None for the last row
+        freq: 'D' for every trading day, or 'W', 'M', 'Y' for the last
+            trading day of each week (Monday-Sunday), month or year
+
+    Returns:
+        int64 array of row positions
+    """
+    if freq not in HISTORY_FREQUENCIES:
+        raise ValueError(f"Invalid freq '{freq}', expected one of {', '.join(HISTORY_FREQUENCIES)}")
+
+    dates = index.values.astype('datetime64[ns]')
+    rows = np.arange(len(dates))
+    if freq != 'D' and len(dates):
+        if freq == 'W':
+            # 1970-01-01 was a Thursday; shift so weeks start on Monday
+            period = (dates.astype('datetime64[D]').astype(np.int64) + 3) // 7
+        else:
+            period = dates.astype(f"datetime64[{freq}]").astype(np.int64)
+        rows = rows[np.append(period[1:] != period[:-1], True)]
+
+    if start is not None:
+        rows = rows[dates[rows] >= np.datetime64(start, 'ns')]
+    if end is not None:
+        rows = rows[dates[rows] <= np.datetime64(end, 'ns')]
+    return rows
+
+
+def metrics_history(frame, rolling, rows, duration='all', risk_factor=3.45, columns=None):
+    """
+    Metrics of every index as of each requested date
+
+    Each as-of date t sees only rows up to t, with the duration window
+    anchored on t, so the last row reproduces get_metrics (before rounding).
+
+    Args:
+        frame: DATE-indexed price DataFrame (sorted, float columns)
+        rolling: RollingVolatility built from the same frame
+        rows: Row positions of the as-of dates (see asof_rows)
+        duration: '3years', '5years', or 'all' window for Ret and Risk
+        risk_factor: Risk = annualized volatility * 100 * risk_factor
+        columns: Index names to include and rank against each other (default: all)
+
+    Returns:
+        Tuple (values, valid): values is a float array (dates x indices x
+        HISTORY_METRICS), NaN where unavailable; valid marks the indices that
+        get_metrics would have returned at that date. Ret and Momentum_12m
+        are in %, RMom is the 0-100 percentile rank of Momentum_12m among
+        the valid indices.
+    """
+    window = duration if duration in ('3years', '5years') else 'all'
+    rows = np.asarray(rows, dtype=np.int64)
+    if columns is None:
+        columns = list(frame.columns)
+    else:
+        frame = frame[columns]
+    values = frame.to_numpy(dtype=float)
+    n = values.shape[1]
+    out = np.full((len(rows), n, len(HISTORY_METRICS)), np.nan)
+    if len(rows) == 0:
+        return out, np.zeros((0, n), dtype=bool)
+
+    cols = np.arange(n)[None, :]
+    valid_obs = ~np.isnan(values)
+    # Observations up to and including each row
+    seen = np.vstack([np.zeros((1, n), dtype=np.int64), np.cumsum(valid_obs, axis=0)])
+
+    starts = rolling.window_starts(window)[rows]
+    count = seen[rows + 1] - seen[starts]
+
+    # First and last price inside each as-of window
+    last = _ffill_positions(valid_obs)[rows]
+    from_end = _ffill_positions(valid_obs[::-1])[::-1]
+    next_valid = np.where(from_end >= 0, len(values) - 1 - from_end, -1)
+    first = next_valid[starts]
+    has_data = count > 0
+    p_start = np.where(has_data, values[np.maximum(first, 0), cols], np.nan)
+    p_end = np.where(has_data, values[np.maximum(last, 0), cols], np.nan)
+
+    day_num = frame.index.values.astype('datetime64[ns]').view('i8') // NS_PER_DAY
+    n_days = np.where(has_data, day_num[np.maximum(last, 0)] - day_num[np.maximum(first, 0)], 0)
+
+    # Ret: CAGR between the window's first and last price
+    ok = (count >= 2) & (n_days > 0) & (p_start != 0)
+    cagr = np.full(count.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        n_years = n_days[ok] / 365.0
+        cagr[ok] = (p_end[ok] / p_start[ok]) ** (1.0 / n_years) - 1.0
+    cagr[~np.isfinite(cagr)] = np.nan
+
+    # Risk from the trailing-window volatility prefix sums
+    annual_vol = rolling.volatility(window, columns, rows).to_numpy()
+    valid = np.isfinite(cagr) & np.isfinite(annual_vol)
+
+    # 12-month momentum: latest price vs the 252nd-from-last observation
+    momentum_12m = np.full(count.shape, np.nan)
+    has_year = count >= 252
+    if has_year.any():
+        # Rows of every observation, grouped by index
+        obs_col, obs_row = np.nonzero(valid_obs.T)
+        bounds = np.searchsorted(obs_col, np.arange(n))
+        back = np.where(has_year, bounds[None, :] + seen[rows + 1] - 252, 0)
+        p_12m_ago = np.where(has_year, values[obs_row[back], cols], np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            momentum_12m = np.where(p_12m_ago != 0, (p_end - p_12m_ago) / p_12m_ago * 100, np.nan)
+        momentum_12m[~np.isfinite(momentum_12m)] = np.nan
+
+    # RMom: percentile rank of momentum among the valid indices at each date
+    rmom = percentile_ranks(np.where(valid, momentum_12m, np.nan))
+
+    out[..., 0] = np.where(valid, cagr * 100, np.nan)
+    out[..., 1] = np.where(valid, (annual_vol * 100) * risk_factor, np.nan)
+    out[..., 2] = np.where(valid, momentum_12m, np.nan)
+    out[..., 3] = rmom
+    return out, valid
@@ -0,0 +1,278 @@
+"""Running per-index state for updating metrics one trading day at a time
+
+Built once from the full history, then each appended day costs O(indices):
+the duration windows slide forward, daily-return mean/variance are kept with
+Welford's method, the last 252 observations sit in a ring buffer for momentum
+and the current month's closing prices are updated in place.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .engine import DURATION_YEARS, NS_PER_DAY, _first_last, _step_returns, duration_start, month_end_panel
+
+MOMENTUM_LOOKBACK = 252
+RUNNING_WINDOWS = ('all', '3years', '5years')
+
+
+class _WindowState:
+    """Per-index state of one duration window (rows `start` to the latest)"""
+
+    def __init__(self, values, start):
+        n = values.shape[1]
+        window = values[start:]
+        self.start = start
+        self.count = np.zeros(n, dtype=np.int64)
+        self.first_row = np.full(n, -1)
+        self.last_row = np.full(n, -1)
+        # Welford accumulators over finite daily returns, plus how many were infinite
+        self.n = np.zeros(n, dtype=np.int64)
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        self.n_inf = np.zeros(n, dtype=np.int64)
+        if len(window) == 0:
+            return
+
+        valid = ~np.isnan(window)
+        self.count = valid.sum(axis=0)
+        first, last = _first_last(valid)
+        has_data = self.count > 0
+        self.first_row = np.where(has_data, first + start, -1)
+        self.last_row = np.where(has_data, last + start, -1)
+
+        returns = _step_returns(window)
+        finite = np.isfinite(returns)
+        self.n = finite.sum(axis=0)
+        self.n_inf = np.isinf(returns).sum(axis=0)
+        finite_returns = np.where(finite, returns, 0.0)
+        ok = self.n > 0
+        self.mean[ok] = finite_returns[:, ok].sum(axis=0) / self.n[ok]
+        self.m2 = np.where(finite, (finite_returns - self.mean) ** 2, 0.0).sum(axis=0)
+
+    def add_returns(self, cols, returns):
+        """Add one daily return to each of `cols`"""
+        infinite = np.isinf(returns)
+        self.n_inf[cols[infinite]] += 1
+        finite = np.isfinite(returns)
+        cols, returns = cols[finite], returns[finite]
+        self.n[cols] += 1
+        delta = returns - self.mean[cols]
+        self.mean[cols] += delta / self.n[cols]
+        self.m2[cols] += delta * (returns - self.mean[cols])
+
+    def remove_returns(self, cols, returns):
+        """Take one daily return (added earlier) back out of each of `cols`"""
+        infinite = np.isinf(returns)
+        self.n_inf[cols[infinite]] -= 1
+        finite = np.isfinite(returns)
+        cols, returns = cols[finite], returns[finite]
+
+        remaining = self.n[cols] - 1
+        emptied = remaining == 0
+        self.n[cols[emptied]] = 0
+        self.mean[cols[emptied]] = 0.0
+        self.m2[cols[emptied]] = 0.0
+
+        cols, returns, remaining = cols[~emptied], returns[~emptied], remaining[~emptied]
+        mean = self.mean[cols]
+        previous_mean = (self.n[cols] * mean - returns) / remaining
+        self.m2[cols] = np.maximum(self.m2[cols] - (returns - previous_mean) * (returns - mean), 0.0)
+        self.mean[cols] = previous_mean
+        self.n[cols] = remaining
+
+
+class RunningMetrics:
+    """Return, volatility and momentum per index, updatable one day at a time"""
+
+    def __init__(self, frame, windows=RUNNING_WINDOWS):
+        """
+        Args:
+            frame: DATE-indexed price DataFrame (sorted, float columns)
+            windows: Durations to track ('all', '1year', '3years', '5years')
+        """
+        self.columns = list(frame.columns)
+        values = frame.to_numpy(dtype=float)
+        size, n = values.shape
+
+        # Private, growable copy of the history (the successors of rows that
+        # slide out of a window are looked up in it)
+        self._size = size
+        self._values = np.empty((size + 256, n))
+        self._values[:size] = values
+        self._dates = np.empty(size + 256, dtype=np.int64)
+        self._dates[:size] = frame.index.values.astype('datetime64[ns]').view('i8')
+
+        self._windows = {}
+        for window in windows:
+            if window != 'all' and window not in DURATION_YEARS:
+                raise ValueError(f"Unknown window '{window}'")
+            self._windows[window] = _WindowState(values, duration_start(frame.index, window))
+
+        # Last MOMENTUM_LOOKBACK observations of each index; observation k
+        # (counting from 1) lives in slot (k - 1) % MOMENTUM_LOOKBACK
+        obs = ~np.isnan(values)
+        rank = np.cumsum(obs, axis=0)
+        self._obs = rank[-1].copy() if size else np.zeros(n, dtype=np.int64)
+        self._ring = np.full((MOMENTUM_LOOKBACK, n), np.nan)
+        rows, cols = np.nonzero(obs & (rank > self._obs - MOMENTUM_LOOKBACK))
+        self._ring[(rank[rows, cols] - 1) % MOMENTUM_LOOKBACK, cols] = values[rows, cols]
+
+        month_ends, prices, _ = month_end_panel(values, self._dates[:size].view('datetime64[ns]'))
+        self._months = list(month_ends.astype('datetime64[M]'))
+        self._month_prices = list(prices)
+
+    @property
+    def last_date(self):
+        """Date of the latest row, or None before any data"""
+        return pd.Timestamp(self._dates[self._size - 1]) if self._size else None
+
+    def update(self, date, prices):
+        """
+        Add one trading day
+
+        Args:
+            date: Date of the new row, later than last_date
+            prices: Prices aligned with self.columns (NaN where missing)
+        """
+        stamp = pd.Timestamp(date)
+        if self._size and stamp.value <= self._dates[self._size - 1]:
+            raise ValueError(f"Date {stamp:%d/%m/%y} is not after {self.last_date:%d/%m/%y}")
+        prices = np.asarray(prices, dtype=float)
+        if prices.shape != (len(self.columns),):
+            raise ValueError(f"Expected {len(self.columns)} prices, got {prices.size}")
+
+        if self._size == len(self._dates):
+            self._values = np.concatenate([self._values, np.empty_like(self._values)])
+            self._dates = np.concatenate([self._dates, np.empty_like(self._dates)])
+        row = self._size
+        self._values[row] = prices
+        self._dates[row] = stamp.value
+        self._size += 1
+
+        cols = np.flatnonzero(~np.isnan(prices))
+        for window, state in self._windows.items():
+            years = DURATION_YEARS.get(window)
+            if years is not None:
+                cutoff = (stamp - pd.DateOffset(years=years)).value
+                start = int(np.searchsorted(self._dates[:row], cutoff, side='left'))
+                for old_row in range(state.start, start):
+                    self._drop_row(state, old_row)
+                state.start = start
+            self._add_row(state, row, cols)
+
+        self._ring[self._obs[cols] % MOMENTUM_LOOKBACK, cols] = prices[cols]
+        self._obs[cols] += 1
+
+        month = stamp.to_datetime64().astype('datetime64[M]')
+        if not self._months:
+            self._months.append(month)
+            self._month_prices.append(np.full(len(self.columns), np.nan))
+        while self._months[-1] < month:
+            # Months without any rows stay NaN, like resample('M')
+            self._months.append(self._months[-1] + 1)
+            self._month_prices.append(np.full(len(self.columns), np.nan))
+        self._month_prices[-1][cols] = prices[cols]
+
+    def _add_row(self, state, row, cols):
+        """Append row `row` (valid in `cols`) to the end of a window"""
+        has_prev = state.count[cols] > 0
+        prev_cols = cols[has_prev]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = self._values[row, prev_cols] / self._values[state.last_row[prev_cols], prev_cols] - 1.0
+        state.add_returns(prev_cols, returns)
+
+        state.first_row[cols[~has_prev]] = row
+        state.last_row[cols] = row
+        state.count[cols] += 1
+
+    def _drop_row(self, state, row):
+        """Slide the start of a window past row `row`"""
+        cols = np.flatnonzero(state.first_row == row)
+        if len(cols) == 0:
+            return
+
+        successors = np.full(len(cols), -1)
+        for k, col in enumerate(cols):
+            last = state.last_row[col]
+            nxt = row + 1
+            while nxt <= last and np.isnan(self._values[nxt, col]):
+                nxt += 1
+            if nxt <= last:
+                successors[k] = nxt
+
+        has_next = successors >= 0
+        next_cols, next_rows = cols[has_next], successors[has_next]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = self._values[next_rows, next_cols] / self._values[row, next_cols] - 1.0
+        state.remove_returns(next_cols, returns)
+
+        state.first_row[cols] = np.where(has_next, successors, -1)
+        state.last_row[cols[~has_next]] = -1
+        state.count[cols] -= 1
+
+    def metrics(self, window='all'):
+        """
+        Current metrics of every index for one tracked window
+
+        Args:
+            window: One of the windows passed to the constructor
+
+        Returns:
+            Dict of NumPy arrays aligned with self.columns, with the same
+            meaning as in compute_panel_metrics: valid, cagr, annual_vol,
+            momentum_12m, plus last_price
+        """
+        state = self._windows.get(window)
+        if state is None:
+            raise ValueError(f"Window '{window}' is not tracked")
+
+        n = len(self.columns)
+        cols = np.arange(n)
+        has_data = state.count > 0
+        p_start = np.where(has_data, self._values[np.maximum(state.first_row, 0), cols], np.nan)
+        p_end = np.where(has_data, self._values[np.maximum(state.last_row, 0), cols], np.nan)
+        day_num = self._dates // NS_PER_DAY
+        n_days = np.where(
+            has_data, day_num[np.maximum(state.last_row, 0)] - day_num[np.maximum(state.first_row, 0)], 0
+        )
+
+        ok = (state.count >= 2) & (n_days > 0) & (p_start != 0)
+        cagr = np.full(n, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            n_years = n_days[ok] / 365.0
+            cagr[ok] = (p_end[ok] / p_start[ok]) ** (1.0 / n_years) - 1.0
+        cagr[~np.isfinite(cagr)] = np.nan
+
+        annual_vol = np.full(n, np.nan)
+        ok = (state.n > 1) & (state.n_inf == 0)
+        annual_vol[ok] = np.sqrt(state.m2[ok] / (state.n[ok] - 1)) * np.sqrt(252)
+
+        momentum_12m = np.full(n, np.nan)
+        has_year = state.count >= MOMENTUM_LOOKBACK
+        if has_year.any():
+            p_12m_ago = self._ring[self._obs % MOMENTUM_LOOKBACK, cols]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                momentum_12m = np.where(
+                    has_year & (p_12m_ago != 0), (p_end - p_12m_ago) / p_12m_ago * 100, np.nan
+                )
+            momentum_12m[~np.isfinite(momentum_12m)] = np.nan
+
+        return {
+            'valid': np.isfinite(cagr) & np.isfinite(annual_vol),
+            'cagr': cagr,
+            'annual_vol': annual_vol,
+            'momentum_12m': momentum_12m,
+            'last_price': p_end,
+        }
+
+    def month_end_prices(self):
+        """
+        Month-end prices including the (possibly partial) current month
+
+        Returns:
+            Tuple (month_ends, prices) as returned by engine.month_end_panel
+        """
+        months = np.array(self._months, dtype='datetime64[M]')
+        month_ends = ((months + 1).astype('datetime64[D]') - 1).astype('datetime64[ns]')
+        prices = np.array(self._month_prices).reshape(len(months), len(self.columns))
+        return month_ends, prices
@@ -0,0 +1,166 @@
+"""Queue-based logging configured from the environment
+
+Records are put on an in-memory queue by the calling thread and written by
+one background listener, so request threads never block on stdout/stderr.
+
+Environment:
+    RISKAPP_LOG_LEVEL     Level of the 'app' and 'riskapp' loggers (default INFO)
+    RISKAPP_LOG_LEVELS    Per-logger overrides, e.g. "riskapp.store=DEBUG,app=WARNING"
+    RISKAPP_LOG_FORMAT    'json' (default, one object per line) or 'text'
+    RISKAPP_DEBUG_SAMPLE  Fraction (0-1) of heatmap requests that log debug traces (default 0)
+    RISKAPP_DEBUG_INDEX   Comma-separated index names whose heatmap requests are always traced
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+
+LOGGER_NAMES = ('app', 'riskapp')
+
+# Logger that carries the sampled per-request debug traces
+TRACE_LOGGER = 'app.trace'
+
+# Attributes every LogRecord has; anything else was passed via extra=
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, including fields passed with extra="""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DebugSampler:
+    """Decides which requests emit debug traces"""
+
+    def __init__(self, rate=0.0, keys=()):
+        """
+        Args:
+            rate: Fraction of requests traced at random
+            keys: Keys (index names) that are always traced
+        """
+        self.rate = rate
+        self.keys = frozenset(keys)
+
+    @property
+    def active(self):
+        """True if any request can be traced"""
+        return self.rate > 0 or bool(self.keys)
+
+    def __call__(self, key=None):
+        """Whether to trace a request for `key`"""
+        if key in self.keys:
+            return True
+        return self.rate > 0 and random.random() < self.rate
+
+
+_LISTENER = None
+_LOCK = threading.Lock()
+_SAMPLER = DebugSampler()
+
+
+def parse_levels(spec):
+    """
+    Parse "name=LEVEL,name=LEVEL" into a dict of logger name -> level
+
+    Unknown level names are ignored.
+    """
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        level = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(level, int):
+            levels[name.strip()] = level
+    return levels
+
+
+def configure_logging(environ=None, stream=None):
+    """
+    Route the 'app' and 'riskapp' loggers through a queue to one writer thread
+
+    Safe to call more than once; only the first call installs handlers.
+
+    Args:
+        environ: Mapping to read settings from (default os.environ)
+        stream: Output stream of the listener (default stderr)
+
+    Returns:
+        The running QueueListener
+    """
+    global _LISTENER, _SAMPLER
+    environ = os.environ if environ is None else environ
+    with _LOCK:
+        if _LISTENER is not None:
+            return _LISTENER
+
+        output = logging.StreamHandler(stream)
+        if environ.get('RISKAPP_LOG_FORMAT', 'json').lower() == 'text':
+            output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        else:
+            output.setFormatter(JSONFormatter())
+
+        records = queue.SimpleQueue()
+        handler = logging.handlers.QueueHandler(records)
+        level = logging.getLevelName(environ.get('RISKAPP_LOG_LEVEL', 'INFO').upper())
+        if not isinstance(level, int):
+            level = logging.INFO
+        for name in LOGGER_NAMES:
+            logger = logging.getLogger(name)
+            logger.addHandler(handler)
+            logger.setLevel(level)
+            logger.propagate = False
+
+        try:
+            rate = float(environ.get('RISKAPP_DEBUG_SAMPLE', 0))
+        except ValueError:
+            rate = 0.0
+        keys = [key.strip() for key in environ.get('RISKAPP_DEBUG_INDEX', '').split(',') if key.strip()]
+        _SAMPLER = DebugSampler(rate, keys)
+        if _SAMPLER.active:
+            # Traces are opt-in per request, so their logger may be more verbose
+            logging.getLogger(TRACE_LOGGER).setLevel(logging.DEBUG)
+
+        for name, logger_level in parse_levels(environ.get('RISKAPP_LOG_LEVELS')).items():
+            logging.getLogger(name).setLevel(logger_level)
+
+        _LISTENER = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        _LISTENER.start()
+        atexit.register(_LISTENER.stop)
+        return _LISTENER
+
+
+def trace_logger(key=None):
+    """
+    Logger for a sampled debug trace of one request, or None to skip tracing
+
+    Costs one level check when tracing is off, so callers can guard building
+    debug messages with it:
+
+        log = trace_logger(index_name)
+        if log:
+            log.debug("...", extra={...})
+
+    Args:
+        key: What the request is about (an index name for the heatmap path)
+    """
+    logger = logging.getLogger(TRACE_LOGGER)
+    if logger.isEnabledFor(logging.DEBUG) and _SAMPLER(key):
+        return logger
+    return None
@@ -1,21 +1,48 @@
 """Core metrics calculation module"""
 
 import pandas as pd
+import logging
 import numpy as np
 import os
+import threading
+import time
+
+from .cache import LRUCache, file_fingerprint
+from .engine import compute_panel_metrics
+from .history import HISTORY_METRICS, asof_rows, metrics_history
+from .incremental import RunningMetrics
+from .names import NAME_RESOLVER
+from .priceindex import get_price_index
+from .ranking import zscores
+from .results import MetricsTable
+from .rolling import build_rolling_volatility
+from .store import append_price_rows, get_price_store
+from .timing import TIMER
+from .v1 import V1_SOURCES, get_v1_map, reconcile_v1
+from .v1store import get_v1_store
+from .windows import get_window_index, resolve_window, window_panel_metrics
+
+logger = logging.getLogger(__name__)
 
 
 class RiskRewardAPI:
     """API class for calculating risk-reward metrics for stock indices"""
     
-    def __init__(self, csv_path=None, excel_path=None):
+    def __init__(self, csv_path=None, excel_path=None, workers=None, v1_source='excel'):
         """
         Initialize the API with data file path
         
         Args:
             csv_path: Path to CSV file with price data. If None, uses default data.csv
             excel_path: Path to Excel file with V1 values. If None, uses default heatmap values.xlsx
+            workers: Number of processes to shard metric computation across (for
+                universes of thousands of indices). None or 1 = compute in-process
+            v1_source: 'excel' to read V1 from the workbook, 'computed' to rank
+                5-year CAGRs from the price data (updates with every data refresh)
         """
+        if v1_source not in V1_SOURCES:
+            raise ValueError(f"Invalid v1_source '{v1_source}', expected one of {', '.join(V1_SOURCES)}")
+        
         if csv_path is None:
             # Use package's default data file
             package_dir = os.path.dirname(os.path.abspath(__file__))
@@ -28,221 +55,299 @@ class RiskRewardAPI:
         
         self.csv_path = csv_path
         self.excel_path = excel_path
-        self._df = None
-        self._v1_df = None
+        self.v1_source = v1_source
+        self._store = get_price_store(csv_path)
+        self._metrics_cache = LRUCache(maxsize=32)
+        self._engine = None
+        if workers and workers > 1:
+            # Needs multiprocessing.shared_memory (Python 3.8+), so only loaded when used
+            from .parallel import ParallelPanelEngine
+            self._engine = ParallelPanelEngine(workers)
+        self._running = None
+        self._running_version = None
+        self._running_lock = threading.Lock()
+        self._v1_store = get_v1_store(excel_path)
         self._load_v1_values()
     
     def load_data(self):
-        """Load and prepare data from CSV"""
-        if self._df is None:
-            self._df = pd.read_csv(self.csv_path)
-            if "DATE" not in self._df.columns:
-                raise ValueError("Expected a 'DATE' column in the CSV.")
-            
-            # Parse DATE and sort
-            self._df["DATE"] = pd.to_datetime(self._df["DATE"], format='%d/%m/%y', errors="coerce")
-            self._df = self._df.dropna(subset=["DATE"]).sort_values("DATE")
-            self._df = self._df.set_index("DATE")
+        """Load and prepare data from CSV
         
-        return self._df
+        Returns:
+            DATE-indexed price DataFrame - a copy of the process-wide shared
+            frame, so callers may modify it
+        """
+        return self._store.get_frame().copy()
     
     def _load_v1_values(self):
-        """Load V1 (percentile) values from Excel file"""
+        """Load V1 (percentile) values from the shared V1 store"""
         try:
-            # Load mapping
-            import sys
-            mapping_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'index_name_mapping.py')
-            if os.path.exists(mapping_path):
-                import importlib.util
-                spec = importlib.util.spec_from_file_location("index_name_mapping", mapping_path)
-                mapping_module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(mapping_module)
-                fullname_to_column = mapping_module.FULLNAME_TO_COLUMN
-                column_to_fullname = mapping_module.COLUMN_TO_FULLNAME
-            else:
-                fullname_to_column = {}
-                column_to_fullname = {}
-            
-            self._v1_df = pd.read_excel(self.excel_path)
-            # Create mapping from CSV column name (short code) to Percentile Value and Full Name
-            self._v1_map = {}
-            self._fullname_map = {}
-            
-            for idx, row in self._v1_df.iterrows():
-                full_name = row['Full Name']
-                percentile = row['Percentile Value']
-                
-                # Try to map full name to column name
-                column_name = fullname_to_column.get(full_name, full_name)
-                
-                self._v1_map[column_name] = round(percentile, 2)
-                self._fullname_map[column_name] = full_name
-                
+            self._v1_map, self._fullname_map = self._v1_store.snapshot().by_column(NAME_RESOLVER)
         except Exception as e:
-            print(f"Warning: Could not load V1 values from Excel: {e}")
+            logger.warning("Could not load V1 values from Excel: %s", e)
             self._v1_map = {}
             self._fullname_map = {}
     
-    def get_metrics(self, duration='all', indices=None):
+    def get_metrics(self, duration='all', indices=None, start=None, end=None, as_of=None):
         """
         Calculate metrics for indices
         
+        Results are cached until the CSV or Excel file changes.
+        
         Args:
             duration: '3years', '5years', or 'all'
-            indices: List of specific index names to calculate. None = all indices
+            indices: List of specific index names to calculate (rows come in
+                data column order whatever their order here). None = all indices
+            start: First date of a custom window (inclusive); overrides duration
+            end: Last date of a custom window (inclusive)
+            as_of: Compute as if the data ended on this date; duration windows
+                and the 4/5-year lookbacks are anchored on it
             
         Returns:
             List of dictionaries with metrics for each index
+            
+        Raises:
+            ValueError if start, end or as_of is not a date
         """
-        df_full = self.load_data()
-        df = df_full.copy()
-        
-        # Filter by duration
-        if duration == '3years':
-            cutoff_date = df.index.max() - pd.DateOffset(years=3)
-            df = df[df.index >= cutoff_date]
-        elif duration == '5years':
-            cutoff_date = df.index.max() - pd.DateOffset(years=5)
-            df = df[df.index >= cutoff_date]
-        
-        price_cols = df.columns
-        if indices:
-            price_cols = [col for col in price_cols if col in indices]
+        # New dicts on every call, so callers can't corrupt the cached table
+        return self.get_metrics_table(duration, indices, start, end, as_of).to_records()
+    
+    def get_metrics_table(self, duration='all', indices=None, start=None, end=None, as_of=None):
+        """
+        get_metrics as a columnar MetricsTable (one array per field)
         
-        results = []
+        Takes the same arguments as get_metrics. The table is shared with the
+        cache - do not modify its arrays; use to_records() or to_frame() for
+        copies.
         
-        for col in price_cols:
-            prices = df[col].astype(float)
-            non_na = prices.dropna()
-            
-            if len(non_na) < 2:
-                continue
-            
-            full_prices = df_full[col].astype(float).dropna()
-            
-            p_start = non_na.iloc[0]
-            p_end = non_na.iloc[-1]
-            n_days = (non_na.index[-1] - non_na.index[0]).days
-            
-            if n_days <= 0 or p_start == 0:
-                continue
-            
-            n_years = n_days / 365.0
-            if n_years == 0:
-                continue
-            
-            # 1. Return (CAGR)
-            cagr = (p_end / p_start) ** (1.0 / n_years) - 1.0
-            if not np.isfinite(cagr):
-                continue
-            
-            # 2. Volatility
-            daily_returns = non_na.pct_change().dropna()
-            if len(daily_returns) < 2:
-                continue
-            
-            daily_vol = daily_returns.std(ddof=1)
-            if not np.isfinite(daily_vol):
-                continue
-            
-            annual_vol = daily_vol * np.sqrt(252)
-            
-            # 3. Risk = Std * 3.45
-            risk = (annual_vol * 100) * 3.45
-            if not np.isfinite(risk):
-                continue
-            
-            # 4. 12-month momentum
-            momentum_12m = None
-            if len(non_na) >= 252:
-                p_current = non_na.iloc[-1]
-                p_12m_ago = non_na.iloc[-252]
-                if p_12m_ago != 0:
-                    momentum_12m = ((p_current - p_12m_ago) / p_12m_ago) * 100
-                
-                if momentum_12m is not None and not np.isfinite(momentum_12m):
-                    momentum_12m = None
-            
-            # 5. 5-year cumulative return for V1
-            cumulative_return_5y = None
-            latest_date = full_prices.index.max()
-            latest_value = full_prices.iloc[-1]
-            target_date_5y_ago = latest_date - pd.DateOffset(years=5)
-            dates_before_target = full_prices.index[full_prices.index <= target_date_5y_ago]
-            
-            if len(dates_before_target) > 0:
-                closest_date_5y_ago = dates_before_target[-1]
-                value_5y_ago = full_prices.loc[closest_date_5y_ago]
-                
-                if value_5y_ago > 0:
-                    cumulative_return_5y = ((latest_value / value_5y_ago) - 1.0) * 100
-            
-            # 6. Average Monthly Profit (4 years)
-            avg_monthly_profit_4y = None
-            four_year_cutoff = latest_date - pd.DateOffset(years=4)
-            four_year_prices = full_prices[full_prices.index >= four_year_cutoff]
-            
-            if len(four_year_prices) > 1:
-                monthly_prices = four_year_prices.resample('M').last().dropna()
-                
-                if len(monthly_prices) > 1:
-                    monthly_returns = monthly_prices.pct_change().dropna() * 100
-                    
-                    if len(monthly_returns) > 0:
-                        avg_monthly_profit_4y = monthly_returns.sum() / len(monthly_returns)
+        Returns:
+            MetricsTable
+        """
+        window = None
+        if start is not None or end is not None or as_of is not None:
+            # Answered from the prefix sums; equal requests share a cache entry
+            # however their dates are spelled
+            window = resolve_window(self._store.get_frame().index, duration, start, end, as_of)
+        # The same names in any order (or repeated) select the same rows
+        indices = frozenset(indices) if indices else None
+        key = (
+            self._store.fingerprint(),
+            file_fingerprint(self.excel_path),
+            duration if window is None else window,
+            indices,
+        )
+        return self._metrics_cache.get_or_compute(
+            key, lambda: self._compute_metrics(duration, indices, window)
+        )
+    
+    def get_v1_reconciliation(self, tolerance=0.05):
+        """
+        Compare V1 computed from the price data with the workbook values
+        
+        Args:
+            tolerance: Largest absolute difference that still counts as a match
             
-            # 7. Mean
-            mean = (cagr * 100 + risk * 100) / 2
+        Returns:
+            DataFrame indexed by index name with columns computed, workbook,
+            difference and match, largest differences first
+        """
+        self._load_v1_values()
+        computed = get_v1_map(self._store.snapshot())
+        return reconcile_v1(computed, self._v1_map, tolerance)
+    
+    def get_cache_stats(self):
+        """
+        Get hit/miss counters of the metrics result cache
+        
+        Returns:
+            Dictionary with hits, misses, coalesced (concurrent misses that
+            shared one computation), size and maxsize
+        """
+        return self._metrics_cache.stats()
+    
+    def _compute_metrics(self, duration, indices, window=None):
+        """Uncached body of get_metrics (window: (start_row, end_row) of a custom window)"""
+        with TIMER.stage('load', 'get_metrics'):
+            snapshot = self._store.snapshot()
+        df = snapshot.frame
+        
+        with TIMER.stage('filter', 'get_metrics'):
+            price_cols = df.columns
+            if indices:
+                price_cols = [col for col in price_cols if col in indices]
+                df = df[price_cols]
+        
+        # Every metric for every requested index in one vectorized pass
+        # (on the shared price matrix itself when no subset is requested),
+        # optionally sharded over worker processes; the cross-sectional
+        # normalization below always sees the merged universe
+        with TIMER.stage('compute', 'get_metrics'):
+            if window is not None:
+                panel = window_panel_metrics(get_window_index(snapshot), *window, columns=price_cols)
+            elif self._engine is not None:
+                panel = self._engine.compute(df, duration, key=(snapshot.fingerprint, tuple(price_cols)))
+            else:
+                panel = compute_panel_metrics(df, duration, get_price_index(snapshot))
+        
+        rank_start = time.perf_counter()
+        rows = np.flatnonzero(panel['valid'])
+        names = np.asarray(price_cols, dtype=object)[rows]
+        cagr = panel['cagr'][rows]
+        
+        # Risk = Std * 3.45
+        risk = (panel['annual_vol'][rows] * 100) * 3.45
+        
+        # Mean
+        mean = (cagr * 100 + risk * 100) / 2
+        
+        # Get V1 values from Excel file (re-read only if it changed) and add full names
+        self._load_v1_values()
+        v1_map = self._v1_map
+        if self.v1_source == 'computed':
+            # Ranked across the whole universe, not just the requested indices
+            v1_map = get_v1_map(snapshot)
+        v1 = np.array([v1_map.get(name, np.nan) for name in names], dtype=float)
+        full_names = np.array(NAME_RESOLVER.display_names(names, self._fullname_map), dtype=object)
+        
+        # Calculate momentum ratio (z-score) and absolute momentum across the universe
+        momentum_ratio, abs_momentum = zscores(panel['momentum_12m'][rows], ddof=1)
+        
+        results = MetricsTable({
+            "Index Name": names,
+            "Ret": np.round(cagr * 100, 1),
+            "AvgMonthlyProfit_4y": np.round(panel['avg_monthly_profit_4y'][rows], 2),
+            "Risk": np.round(risk, 1),
+            "Mean": np.round(mean, 1),
+            "V1": np.round(v1, 3),
+            "Full Name": full_names,
+            "Momentum": np.round(momentum_ratio, 2),
+            "AbsMom": np.round(abs_momentum, 2),
+        })
+        
+        TIMER.observe('rank', time.perf_counter() - rank_start, 'get_metrics')
+        return results
+    
+    def append_prices(self, date, prices):
+        """
+        Append one trading day of prices to the data file
+        
+        Only the new line is written to the CSV and the binary sidecar grows in
+        place, so nothing is reparsed; running metrics (see get_running_metrics)
+        are updated for just the new day.
+        
+        Args:
+            date: Date of the new prices, later than the last date in the file
+            prices: Dictionary of index name -> price (missing indices are left empty)
+        """
+        rows = pd.DataFrame(
+            [prices], index=pd.DatetimeIndex([pd.Timestamp(date)], name='DATE'), dtype=float
+        )
+        with self._running_lock:
+            version = self._store.fingerprint()
+            appended = append_price_rows(self.csv_path, rows)
+            if self._running is not None and self._running_version == version:
+                for day, values in zip(appended.index, appended.to_numpy(dtype=float)):
+                    self._running.update(day, values)
+                self._running_version = self._store.fingerprint()
+    
+    def get_running_metrics(self, duration='all'):
+        """
+        Return, risk and 12-month momentum from the incrementally updated state
+        
+        The state is built from the full history on first use and then kept up
+        to date by append_prices; it is rebuilt if the CSV is changed elsewhere.
+        
+        Args:
+            duration: '3years', '5years', or 'all'
             
+        Returns:
+            List of dictionaries with Index Name, Ret, Risk and Momentum_12m
+        """
+        window = duration if duration in ('3years', '5years') else 'all'
+        with self._running_lock:
+            if self._running is None or self._running_version != self._store.fingerprint():
+                snapshot = self._store.snapshot()
+                self._running = RunningMetrics(snapshot.frame)
+                self._running_version = snapshot.fingerprint
+            panel = self._running.metrics(window)
+            columns = self._running.columns
+        
+        results = []
+        for i in np.flatnonzero(panel['valid']):
+            momentum_12m = panel['momentum_12m'][i]
             results.append({
-                "Index Name": col,
-                "Ret": round(cagr * 100, 1),
-                "Cumulative_5y": cumulative_return_5y,
-                "AvgMonthlyProfit_4y": round(avg_monthly_profit_4y, 2) if avg_monthly_profit_4y is not None else None,
-                "Risk": round(risk, 1),
-                "Mean": round(mean, 1),
-                "Momentum_12m": momentum_12m
+                "Index Name": columns[i],
+                "Ret": round(panel['cagr'][i] * 100, 1),
+                "Risk": round((panel['annual_vol'][i] * 100) * 3.45, 1),
+                "Momentum_12m": None if np.isnan(momentum_12m) else momentum_12m,
             })
+        return results
+    
+    def get_volatility_history(self, window='3years', indices=None):
+        """
+        Annualized volatility and Risk of each index over a trailing window, at every date
         
-        # Get V1 values from Excel file and add full names
-        for result in results:
-            index_name = result['Index Name']
-            # Get V1 from Excel mapping
-            result['V1'] = self._v1_map.get(index_name, None)
-            if result['V1'] is not None:
-                result['V1'] = round(result['V1'], 3)
-            
-            # Add full display name
-            result['Full Name'] = self._fullname_map.get(index_name, index_name)
+        Args:
+            window: '1year', '3years', '5years', 'all' (expanding) or a number of trading days
+            indices: List of specific index names. None = all indices
             
-            del result['Cumulative_5y']
+        Returns:
+            pandas DataFrame indexed by DATE with (metric, index name) columns:
+            'Volatility' (annualized std of daily returns) and 'Risk' (Volatility * 100 * 3.45)
+        """
+        snapshot = self._store.snapshot()
+        rolling = snapshot.derived('rolling_volatility', build_rolling_volatility)
         
-        # Calculate momentum ratio
-        valid_momentum_12m = [r['Momentum_12m'] for r in results if r['Momentum_12m'] is not None]
+        columns = rolling.columns
+        if indices:
+            columns = [col for col in columns if col in indices]
+        
+        vol = rolling.volatility(window, columns)
+        return pd.concat({'Volatility': vol, 'Risk': (vol * 100) * 3.45}, axis=1)
+    
+    def get_metrics_history(self, start=None, end=None, freq='D', duration='all', indices=None):
+        """
+        Ret, Risk, 12-month momentum and RMom as of every date, in one pass
+        
+        Each as-of date only sees prices up to that date, so this is what
+        get_metrics would have returned on that day (without rounding).
         
-        if len(valid_momentum_12m) > 1:
-            avg_momentum = np.mean(valid_momentum_12m)
-            sd_momentum = np.std(valid_momentum_12m, ddof=1)
+        Args:
+            start: First as-of date (inclusive). None = first date in the data
+            end: Last as-of date (inclusive). None = last date in the data
+            freq: 'D' (every trading day), 'W', 'M' or 'Y' (last trading day of each period)
+            duration: '3years', '5years', or 'all' window for Ret and Risk
+            indices: List of specific index names. None = all indices
             
-            for result in results:
-                if result['Momentum_12m'] is not None and sd_momentum > 0:
-                    momentum_ratio = (result['Momentum_12m'] - avg_momentum) / sd_momentum
-                    result['Momentum'] = round(momentum_ratio, 2)
-                    
-                    abs_momentum = result['Momentum_12m'] / sd_momentum
-                    result['AbsMom'] = round(abs_momentum, 2)
-                else:
-                    result['Momentum'] = None
-                    result['AbsMom'] = None
-        else:
-            for result in results:
-                result['Momentum'] = None
-                result['AbsMom'] = None
-        
-        for result in results:
-            del result['Momentum_12m']
+        Returns:
+            Dictionary with:
+                dates: DatetimeIndex of the as-of dates
+                indices: List of index names
+                metrics: Metric names ('Ret', 'Risk', 'Momentum_12m', 'RMom')
+                values: float array (dates x indices x metrics), NaN where unavailable
+                valid: bool array (dates x indices), True where the index would be listed
+        """
+        snapshot = self._store.snapshot()
+        df = snapshot.frame
+        rolling = snapshot.derived('rolling_volatility', build_rolling_volatility)
         
-        return results
+        price_cols = list(df.columns)
+        if indices:
+            price_cols = [col for col in price_cols if col in indices]
+        
+        rows = asof_rows(df.index, start, end, freq)
+        values, valid = metrics_history(df, rolling, rows, duration, columns=price_cols)
+        return {
+            'dates': df.index[rows],
+            'indices': price_cols,
+            'metrics': HISTORY_METRICS,
+            'values': values,
+            'valid': valid,
+        }
+    
+    def close(self):
+        """Shut down worker processes started for workers > 1"""
+        if self._engine is not None:
+            self._engine.close()
     
     def get_index_data(self, index_name):
         """
@@ -254,12 +359,22 @@ class RiskRewardAPI:
         Returns:
             pandas Series with date index and prices
         """
-        df = self.load_data()
+        df = self._store.get_frame()
         if index_name not in df.columns:
             raise ValueError(f"Index '{index_name}' not found in data")
         
         return df[index_name].dropna()
     
+    def get_price_index(self):
+        """
+        Price lookups for every index between any two dates
+        
+        Returns:
+            PriceIndex of the current data (shared and rebuilt only when the
+            data changes)
+        """
+        return get_price_index(self._store.snapshot())
+    
     def get_available_indices(self):
         """
         Get list of all available index names
@@ -267,5 +382,5 @@ class RiskRewardAPI:
         Returns:
             List of index names
         """
-        df = self.load_data()
+        df = self._store.get_frame()
         return df.columns.tolist()
@@ -0,0 +1,178 @@
+"""Resolve short codes, full names and aliases of an index to its CSV column name
+
+All lookup tables are built once (NAME_RESOLVER, at import) from
+index_name_mapping.py next to the package, so resolving a name is a few dict
+lookups: exact, then case-folded, then case-folded with whitespace collapsed.
+"""
+
+import importlib.util
+import logging
+import os
+import re
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+
+MAPPING_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'index_name_mapping.py')
+
+
+def normalize_name(name):
+    """Case-folded name with runs of whitespace collapsed to one space"""
+    return _WHITESPACE.sub(' ', name).strip().casefold()
+
+
+class NameResolver:
+    """Precomputed name -> CSV column lookup plus column -> full display name"""
+
+    def __init__(self, column_to_fullname, aliases=None):
+        """
+        Args:
+            column_to_fullname: CSV column name (short code) -> full display name
+            aliases: Other name -> short code, full name or another alias
+        """
+        self.column_to_fullname = dict(column_to_fullname)
+        self.fullname_to_column = {v: k for k, v in self.column_to_fullname.items()}
+
+        self._exact = {}
+        self._folded = {}
+        self._normalized = {}
+        # Earlier tables win on collisions: codes, then full names, then aliases
+        codes = {code: code for code in self.column_to_fullname}
+        for table in (codes, self.fullname_to_column, self._follow_aliases(aliases or {})):
+            for name, column in table.items():
+                self._exact.setdefault(name, column)
+                if isinstance(name, str):
+                    self._folded.setdefault(name.casefold(), column)
+                    self._normalized.setdefault(normalize_name(name), column)
+
+        # Display names per preferred-name map (one per V1 workbook version)
+        self._display_tables = LRUCache(maxsize=4)
+        self.display_table()
+
+    def _follow_aliases(self, aliases):
+        """Alias -> column, following alias chains (unresolvable aliases are dropped)"""
+        resolved = {}
+        for alias in aliases:
+            target, seen = aliases[alias], {alias}
+            while target not in self.column_to_fullname and target not in self.fullname_to_column \
+                    and target in aliases and target not in seen:
+                seen.add(target)
+                target = aliases[target]
+            column = self.fullname_to_column.get(target, target)
+            if column in self.column_to_fullname:
+                resolved[alias] = column
+            else:
+                logger.debug("Alias %r does not lead to a known column", alias)
+        return resolved
+
+    def resolve(self, name, default=None):
+        """
+        CSV column name for a short code, full name or alias
+
+        Args:
+            name: Name to look up (exact match first, then ignoring case and
+                extra whitespace)
+            default: Returned when the name is unknown
+
+        Returns:
+            Column name or default
+        """
+        column = self._exact.get(name)
+        if column is not None or not isinstance(name, str):
+            return column if column is not None else default
+        column = self._folded.get(name.casefold())
+        if column is None:
+            column = self._normalized.get(normalize_name(name), default)
+        return column
+
+    def full_name(self, column):
+        """Full display name of a CSV column (the column name itself if unknown)"""
+        return self.column_to_fullname.get(column, column)
+
+    def _build_display_table(self, preferred):
+        """Column -> display name over every mapped or preferred column"""
+        taken = {}
+        for column, name in preferred.items():
+            taken.setdefault(normalize_name(name), column)
+        table = dict(preferred)
+        for column, name in self.column_to_fullname.items():
+            if column in table:
+                continue
+            if taken.setdefault(normalize_name(name), column) != column:
+                name = column
+            table[column] = name
+        return table
+
+    def display_table(self, preferred=None):
+        """
+        Full display name of every known column, without duplicates
+
+        A column's preferred name (e.g. the V1 workbook's Full Name) wins;
+        otherwise its mapped full name is used, unless a preferred name or an
+        earlier mapped column already displays that name (ignoring case and
+        whitespace) - as with pandas' deduplicated 'NAME.1' copy of a column -
+        in which case the column name itself is shown. Conflicts are settled
+        once over the whole universe, so a column's label never depends on
+        which other columns a result contains.
+
+        Args:
+            preferred: CSV column name -> preferred display name
+
+        Returns:
+            Dict of CSV column name -> display name (built once per preferred map)
+        """
+        preferred = {column: name for column, name in (preferred or {}).items() if name}
+        return self._display_tables.get_or_compute(
+            frozenset(preferred.items()), lambda: self._build_display_table(preferred)
+        )
+
+    def display_names(self, columns, preferred=None):
+        """
+        Display names of the columns of a result (see display_table)
+
+        Args:
+            columns: CSV column names, in result order
+            preferred: CSV column name -> preferred display name, for the
+                whole universe rather than only these columns
+
+        Returns:
+            List of display names aligned with columns (unknown columns show
+            their own name)
+        """
+        table = self.display_table(preferred)
+        return [table.get(column, column) for column in columns]
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def __len__(self):
+        return len(self._exact)
+
+
+def load_name_resolver(mapping_path=MAPPING_PATH):
+    """
+    Build a NameResolver from an index_name_mapping.py file
+
+    The module lives next to the package rather than inside it, so it is
+    loaded from its path. A missing file gives an empty resolver.
+
+    Args:
+        mapping_path: Path of the mapping module (COLUMN_TO_FULLNAME and
+            optionally ALIASES)
+
+    Returns:
+        NameResolver
+    """
+    if not os.path.exists(mapping_path):
+        logger.warning("Name mapping %s not found, using CSV column names as they are", mapping_path)
+        return NameResolver({})
+    spec = importlib.util.spec_from_file_location("index_name_mapping", mapping_path)
+    mapping_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mapping_module)
+    return NameResolver(mapping_module.COLUMN_TO_FULLNAME, getattr(mapping_module, 'ALIASES', {}))
+
+
+NAME_RESOLVER = load_name_resolver()
@@ -0,0 +1,173 @@
+"""Binary columnar sidecar for the price CSV
+
+The sidecar sits next to the CSV (``data.csv`` -> ``data.csv.panel``) and holds
+three standard ``.npy`` records back to back:
+
+    source   int64[2]              (mtime_ns, size) of the CSV it was built from
+    columns  unicode[n]            index names
+    rows     float64[rows, 1 + n]  DATE as days since the epoch, then the prices
+
+The row matrix is last so new trading days can be appended in place (the
+``.npy`` header reserves room for the row count to grow). The sidecar is only
+used while the CSV still has the recorded fingerprint, so editing data.csv by
+hand transparently falls back to a full parse.
+
+Build it with:
+    python -m riskapp convert path/to/data.csv
+"""
+
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib import format as npy_format
+
+SIDECAR_SUFFIX = '.panel'
+
+
+def sidecar_path(csv_path):
+    """Path of the binary sidecar for a CSV file"""
+    return csv_path + SIDECAR_SUFFIX
+
+
+def _row_matrix(dates, prices):
+    """Stack DATE (days since the epoch) in front of the price columns"""
+    days = np.asarray(dates, dtype='datetime64[ns]').astype('datetime64[D]').astype(np.float64)
+    return np.ascontiguousarray(np.column_stack([days, np.asarray(prices, dtype=np.float64)]))
+
+
+def write_panel(frame, path, source):
+    """
+    Write a price frame to a sidecar file atomically
+
+    Args:
+        frame: DATE-indexed float DataFrame
+        path: Destination path
+        source: (mtime_ns, size) of the CSV the frame was parsed from
+    """
+    columns = np.array([str(col) for col in frame.columns])
+    rows = _row_matrix(frame.index.values, frame.to_numpy(dtype=np.float64))
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, 'wb') as f:
+            for array in (np.asarray(source, dtype=np.int64), columns, rows):
+                npy_format.write_array(f, array, allow_pickle=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def append_rows(path, dates, prices, source, expected_source=None):
+    """
+    Append trading days to a sidecar in place
+
+    The new rows are written past the end of the data first and only then
+    published by rewriting the row count and the source fingerprint, so a
+    reader never maps a half-written row.
+
+    Args:
+        path: Sidecar path
+        dates: datetime64 values of the new rows
+        prices: (len(dates) x n) prices in column order
+        source: (mtime_ns, size) of the CSV after the same rows were appended
+        expected_source: If given, only append when the sidecar was built from
+            this CSV fingerprint
+
+    Returns:
+        True if appended, False if the sidecar did not match expected_source
+    """
+    rows = _row_matrix(dates, np.atleast_2d(prices))
+    with open(path, 'r+b') as f:
+        source_offset = _skip_header(f)
+        recorded = tuple(int(v) for v in np.fromfile(f, dtype=np.int64, count=2))
+        if expected_source is not None and recorded != tuple(expected_source):
+            return False
+
+        dtype, shape = _read_header(f)
+        f.seek(f.tell() + int(np.prod(shape, dtype=np.int64)) * dtype.itemsize)
+
+        header_offset = f.tell()
+        version = npy_format.read_magic(f)
+        f.seek(header_offset)
+        dtype, shape = _read_header(f)
+        data_offset = f.tell()
+        if shape[1] != rows.shape[1]:
+            raise ValueError(f"Expected {shape[1] - 1} price columns, got {rows.shape[1] - 1}")
+
+        f.seek(data_offset + shape[0] * shape[1] * dtype.itemsize)
+        f.write(np.ascontiguousarray(rows, dtype=dtype).tobytes())
+        f.flush()
+
+        header = io.BytesIO()
+        new_shape = {'descr': npy_format.dtype_to_descr(dtype), 'fortran_order': False,
+                     'shape': (shape[0] + rows.shape[0], shape[1])}
+        if version == (1, 0):
+            npy_format.write_array_header_1_0(header, new_shape)
+        else:
+            npy_format.write_array_header_2_0(header, new_shape)
+        if len(header.getvalue()) != data_offset - header_offset:
+            raise ValueError("Sidecar header has no room left to grow")
+        f.seek(header_offset)
+        f.write(header.getvalue())
+
+        f.seek(source_offset)
+        f.write(np.asarray(source, dtype=np.int64).tobytes())
+    return True
+
+
+def _read_header(f):
+    """Read one .npy header, returning (dtype, shape) with f positioned at the data"""
+    version = npy_format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = npy_format.read_array_header_1_0(f)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = npy_format.read_array_header_2_0(f)
+    else:
+        raise ValueError(f"Unsupported .npy record version {version}")
+    if fortran_order:
+        raise ValueError("Unexpected Fortran-ordered record")
+    return dtype, shape
+
+
+def _skip_header(f):
+    """Skip one .npy header, returning the offset of its data"""
+    _read_header(f)
+    return f.tell()
+
+
+def read_panel(path, mmap=False):
+    """
+    Read a sidecar file
+
+    Args:
+        path: Sidecar path
+        mmap: Map the row matrix read-only instead of reading it into memory,
+            so every process using the file shares one page-cache copy
+
+    Returns:
+        Tuple (source, frame): the CSV fingerprint it was built from and the
+        DATE-indexed float DataFrame (read-only when mapped)
+    """
+    with open(path, 'rb') as f:
+        _read_header(f)
+        source = tuple(int(v) for v in np.fromfile(f, dtype=np.int64, count=2))
+
+        dtype, shape = _read_header(f)
+        columns = np.fromfile(f, dtype=dtype, count=int(np.prod(shape, dtype=np.int64)))
+
+        dtype, shape = _read_header(f)
+        if len(shape) != 2 or shape[1] != len(columns) + 1:
+            raise ValueError(f"Unexpected sidecar row matrix shape {shape}")
+        count = int(np.prod(shape, dtype=np.int64))
+        if mmap and count > 0:
+            rows = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape)
+        else:
+            rows = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+
+    days = np.asarray(rows[:, 0]).astype(np.int64).astype('datetime64[D]')
+    index = pd.DatetimeIndex(days.astype('datetime64[ns]'), name='DATE')
+    frame = pd.DataFrame(rows[:, 1:], index=index, columns=columns.tolist(), copy=False)
+    return source, frame
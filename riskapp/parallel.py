@@ -0,0 +1,111 @@
+"""Process-pool execution of the panel metrics engine for very wide universes
+
+The price matrix is copied once per data version into a
+``multiprocessing.shared_memory`` block; workers attach to it by name and
+receive only column ranges, so no DataFrame is ever pickled.
+"""
+
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .engine import compute_panel_metrics
+
+
+def _shard_metrics(shm_name, shape, dates, start, stop, duration):
+    """compute_panel_metrics for columns [start, stop) of the shared matrix (runs in a worker)"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)[:, start:stop].copy()
+    finally:
+        shm.close()
+    frame = pd.DataFrame(values, index=pd.DatetimeIndex(dates, name='DATE'), copy=False)
+    return compute_panel_metrics(frame, duration)
+
+
+class ParallelPanelEngine:
+    """Shards compute_panel_metrics over columns across a ProcessPoolExecutor
+
+    Every metric is per-index, so shards are independent; the caller applies
+    the cross-sectional normalization (Momentum z-scores, RMom) to the merged
+    result as before.
+    """
+
+    def __init__(self, workers=None, min_columns_per_shard=64):
+        """
+        Args:
+            workers: Number of worker processes (default: os.cpu_count())
+            min_columns_per_shard: Narrower universes use fewer shards, and a
+                single shard runs in-process
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.min_columns_per_shard = min_columns_per_shard
+        self._executor = None
+        self._shared = None
+        self._shared_key = None
+        self._lock = threading.Lock()
+
+    def compute(self, frame, duration='all', key=None):
+        """
+        Same result as engine.compute_panel_metrics(frame, duration)
+
+        Args:
+            frame: DATE-indexed price DataFrame (sorted, float columns)
+            duration: '3years', '5years', or 'all'
+            key: Identity of the frame's data version (e.g. the CSV
+                fingerprint); the shared copy is reused while it is unchanged.
+                None always copies.
+
+        Returns:
+            Dict of NumPy arrays aligned with frame.columns
+        """
+        n = len(frame.columns)
+        shards = min(self.workers, max(n // self.min_columns_per_shard, 1))
+        if shards <= 1 or len(frame) == 0:
+            return compute_panel_metrics(frame, duration)
+
+        bounds = np.linspace(0, n, shards + 1).astype(int)
+        dates = frame.index.values.astype('datetime64[ns]')
+        with self._lock:
+            shm = self._share(frame, key)
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                # Free the shared block even if close() is never called
+                atexit.register(self.close)
+            futures = [
+                self._executor.submit(_shard_metrics, shm.name, frame.shape, dates, a, b, duration)
+                for a, b in zip(bounds[:-1], bounds[1:])
+            ]
+            parts = [future.result() for future in futures]
+
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+    def _share(self, frame, key):
+        """Shared-memory copy of the frame's values, replaced when the data version changes"""
+        if self._shared is not None and key is not None and key == self._shared_key:
+            return self._shared
+
+        self._release()
+        shm = shared_memory.SharedMemory(create=True, size=max(frame.size * 8, 1))
+        np.ndarray(frame.shape, dtype=np.float64, buffer=shm.buf)[:] = frame.to_numpy(dtype=float)
+        self._shared, self._shared_key = shm, key
+        return shm
+
+    def _release(self):
+        if self._shared is not None:
+            self._shared.close()
+            self._shared.unlink()
+            self._shared, self._shared_key = None, None
+
+    def close(self):
+        """Shut down the worker processes and free the shared memory"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            self._release()
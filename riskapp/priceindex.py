@@ -0,0 +1,231 @@
+"""Price of every index at any date, and returns between any two dates, by binary search
+
+A PriceIndex is built once per data version (see get_price_index). It keeps
+the rows of every index's observations, grouped by index, so a lookback such
+as "price five years before the latest date" is a searchsorted over the dates
+plus one searchsorted over the observations instead of a filter over the
+index's history. It stores one small integer per observation - no dense
+dates x indices matrix besides the (shared, memory-mapped) prices themselves.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .engine import _offset_dates
+
+
+def _datetimes(when):
+    """datetime64[ns] array of one date or a sequence of dates (anything pd.Timestamp accepts)"""
+    if np.ndim(when) == 0:
+        return np.array([np.datetime64(pd.Timestamp(when), 'ns')])
+    return pd.DatetimeIndex(when).values.astype('datetime64[ns]')
+
+
+class PriceIndex:
+    """Observation rows of every index of a price frame, searchable by row or date"""
+
+    def __init__(self, frame):
+        """
+        Args:
+            frame: DATE-indexed price DataFrame (sorted, float columns)
+        """
+        self.index = frame.index
+        self.columns = list(frame.columns)
+        self.dates = frame.index.values.astype('datetime64[ns]')
+        self.values = frame.to_numpy(dtype=float)
+        self._column_positions = {col: j for j, col in enumerate(self.columns)}
+
+        size, n = self.values.shape
+        self._size = size
+        # Observation k of index j is row _obs_key[obs_start[j] + k] - j * size;
+        # keys increase across the whole array, so one searchsorted serves every index
+        dtype = np.int32 if size * n < 2**31 else np.int64
+        obs_col, obs_row = np.nonzero(~np.isnan(self.values.T))
+        self._obs_key = (obs_col.astype(dtype) * size + obs_row).astype(dtype)
+        self.obs_start = np.searchsorted(obs_col, np.arange(n + 1))
+
+    def _cols(self, columns):
+        """Column positions of the given names (None = all, in order)"""
+        if columns is None or list(columns) == self.columns:
+            return np.arange(len(self.columns))
+        return np.array([self._column_positions[col] for col in columns], dtype=np.int64)
+
+    def _last_at_or_before(self, rows, cols):
+        """Row of the last observation at or before rows (broadcast with cols), -1 if none"""
+        if len(self._obs_key) == 0:
+            return np.full(np.broadcast(rows, cols).shape, -1)
+        base = cols * self._size
+        idx = np.searchsorted(self._obs_key, base + rows, side='right') - 1
+        found = (rows >= 0) & (idx >= self.obs_start[cols])
+        return np.where(found, self._obs_key[np.maximum(idx, 0)] - base, -1)
+
+    def _first_at_or_after(self, rows, cols):
+        """Row of the first observation at or after rows (broadcast with cols), -1 if none"""
+        if len(self._obs_key) == 0:
+            return np.full(np.broadcast(rows, cols).shape, -1)
+        base = cols * self._size
+        idx = np.searchsorted(self._obs_key, base + rows, side='left')
+        found = (rows < self._size) & (idx < self.obs_start[cols + 1])
+        return np.where(found, self._obs_key[np.minimum(idx, len(self._obs_key) - 1)] - base, -1)
+
+    def _prices(self, rows, cols):
+        """Price at each (row, column) position, NaN where the row is -1"""
+        if self._size == 0:
+            return np.full(np.broadcast(rows, cols).shape, np.nan)
+        out = self.values[np.maximum(rows, 0), cols]
+        return np.where(rows >= 0, out, np.nan)
+
+    def last_obs_rows(self, row, columns=None):
+        """Row of each index's last price at or before a row (-1 if none)"""
+        return self._last_at_or_before(np.asarray(row)[..., None], self._cols(columns))
+
+    def first_obs_rows(self, row, columns=None):
+        """Row of each index's first price at or after a row (-1 if none)"""
+        return self._first_at_or_after(np.asarray(row)[..., None], self._cols(columns))
+
+    def obs_counts(self, start_row, end_row, columns=None):
+        """Number of prices of each index in rows start_row..end_row (inclusive)"""
+        cols = self._cols(columns)
+        base = cols * self._size
+        return (np.searchsorted(self._obs_key, base + end_row, side='right')
+                - np.searchsorted(self._obs_key, base + start_row, side='left'))
+
+    def nth_last_obs_rows(self, end_row, nth, columns=None):
+        """
+        Row of each index's nth-from-last price at or before end_row
+
+        Args:
+            end_row: Last row considered
+            nth: 1 = the last price, 2 = the one before it, ...
+            columns: Index names (default: all columns)
+
+        Returns:
+            Per-index int array, -1 where an index has fewer than nth prices
+        """
+        cols = self._cols(columns)
+        if len(self._obs_key) == 0:
+            return np.full(len(cols), -1)
+        base = cols * self._size
+        idx = np.searchsorted(self._obs_key, base + end_row, side='right') - nth
+        found = idx >= self.obs_start[cols]
+        return np.where(found, self._obs_key[np.maximum(idx, 0)] - base, -1)
+
+    def last_rows(self, when=None, columns=None):
+        """
+        Row of each index's last price on or before a date
+
+        Args:
+            when: Date or sequence of dates; None = the last row
+            columns: Index names (default: all columns)
+
+        Returns:
+            int array (indices,) for one date, (dates x indices) for a sequence;
+            -1 where an index has no price that early
+        """
+        if when is None:
+            return self.last_obs_rows(len(self.dates) - 1, columns)
+        rows = np.searchsorted(self.dates, _datetimes(when), side='right') - 1
+        out = self.last_obs_rows(rows, columns)
+        return out[0] if np.ndim(when) == 0 else out
+
+    def first_rows(self, when, columns=None):
+        """
+        Row of each index's first price on or after a date
+
+        Args:
+            when: Date or sequence of dates
+            columns: Index names (default: all columns)
+
+        Returns:
+            int array shaped like last_rows; -1 where an index has no price that late
+        """
+        rows = np.searchsorted(self.dates, _datetimes(when), side='left')
+        out = self.first_obs_rows(rows, columns)
+        return out[0] if np.ndim(when) == 0 else out
+
+    def price_at(self, when=None, columns=None):
+        """Each index's last price on or before a date (NaN before its first price)"""
+        return self._prices(self.last_rows(when, columns), self._cols(columns))
+
+    def total_return(self, start, end=None, columns=None):
+        """
+        % change of every index between its prices on (or before) two dates
+
+        Args:
+            start: Start date
+            end: End date (default: the last row)
+            columns: Index names (default: all columns)
+
+        Returns:
+            Per-index array, NaN where either price is missing or the start
+            price is not positive
+        """
+        p_start = self.price_at(start, columns)
+        p_end = self.price_at(end, columns)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(p_start > 0, (p_end / p_start - 1.0) * 100, np.nan)
+
+    def annualized_return(self, start, end=None, columns=None):
+        """
+        CAGR (% per year) of every index between two dates
+
+        Prices are taken on or before each date, like total_return; the
+        period is the calendar time between the two dates (365-day years).
+
+        Returns:
+            Per-index array, NaN where total_return is NaN or the dates don't
+            span at least one day
+        """
+        end_date = self.dates[-1] if end is None else _datetimes(end)[0]
+        days = (end_date - _datetimes(start)[0]) / np.timedelta64(1, 'D')
+        cumulative = self.total_return(start, end, columns)
+        if days <= 0:
+            return np.full(cumulative.shape, np.nan)
+        with np.errstate(invalid='ignore'):
+            return ((1.0 + cumulative / 100) ** (365.0 / days) - 1.0) * 100
+
+    def lookback_rows(self, years, end_row=None, columns=None):
+        """
+        Rows of each index's latest price and of its last price `years` before it
+
+        Args:
+            years: Calendar years to look back (pd.DateOffset) from each
+                index's own latest date
+            end_row: Treat the data as ending at this row (default: last row)
+            columns: Index names (default: all columns)
+
+        Returns:
+            Tuple (latest_rows, past_rows) of per-index int arrays, -1 where
+            there is no such price
+        """
+        cols = self._cols(columns)
+        end_row = len(self.dates) - 1 if end_row is None else end_row
+        latest = self._last_at_or_before(np.asarray(end_row), cols)
+        past = np.full(latest.shape, -1)
+        has_data = latest >= 0
+        if has_data.any():
+            target = _offset_dates(self.dates[latest[has_data]], years)
+            target_row = np.searchsorted(self.dates, target, side='right') - 1
+            past[has_data] = self._last_at_or_before(target_row, cols[has_data])
+        return latest, past
+
+    def trailing_return(self, years, end_row=None, columns=None):
+        """
+        % change of every index since its last price `years` before its own
+        latest date (engine.trailing_return from lookups)
+
+        Returns:
+            Per-index array, NaN where an index has no price that far back or
+            the past price is not positive
+        """
+        cols = self._cols(columns)
+        latest, past = self.lookback_rows(years, end_row, columns)
+        latest_value = self._prices(latest, cols)
+        past_value = self._prices(past, cols)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(past_value > 0, ((latest_value / past_value) - 1.0) * 100, np.nan)
+
+
+def get_price_index(snapshot):
+    """The PriceIndex of a PriceSnapshot (built once per data version)"""
+    return snapshot.derived('price_index', PriceIndex)
@@ -0,0 +1,100 @@
+"""Cross-sectional ranking of index metrics (RMom percentiles, momentum z-scores)
+
+Every function takes either one universe (1-D) or a dates x indices matrix,
+which is ranked row by row. NaN entries are left out of the ranking.
+"""
+
+import numpy as np
+
+TIE_POLICIES = ('ordinal', 'average', 'min', 'max')
+
+
+def percentile_ranks(values, ties='ordinal'):
+    """
+    0-100 percentile rank of every value among the non-NaN values of its row
+
+    Args:
+        values: 1-D array (one universe) or 2-D array (dates x indices)
+        ties: How equal values are ranked:
+            'ordinal' - in input order, like sorting (index, momentum) tuples
+            'average' - mean of the ranks they span
+            'min' / 'max' - lowest / highest rank they span
+
+    Returns:
+        float array shaped like values: rank / (n - 1) * 100 with rank from 0
+        and n the number of ranked values in the row; NaN where the value is
+        NaN or the row has fewer than two values
+    """
+    if ties not in TIE_POLICIES:
+        raise ValueError(f"Invalid ties '{ties}', expected one of {', '.join(TIE_POLICIES)}")
+
+    values = np.asarray(values, dtype=float)
+    matrix = np.atleast_2d(values)
+    ranked = np.isfinite(matrix)
+    n_ranked = ranked.sum(axis=1, keepdims=True)
+
+    # Unranked values sort last, so ranks 0..n-1 belong to the ranked ones
+    keys = np.where(ranked, matrix, np.inf)
+    order = np.argsort(keys, axis=1, kind='stable')
+    positions = np.broadcast_to(np.arange(matrix.shape[1]), matrix.shape)
+
+    if ties == 'ordinal':
+        sorted_rank = positions.astype(float)
+    else:
+        sorted_keys = np.take_along_axis(keys, order, axis=1)
+        new_value = np.ones(matrix.shape, dtype=bool)
+        new_value[:, 1:] = sorted_keys[:, 1:] != sorted_keys[:, :-1]
+        # First and last position of each run of equal values
+        low = np.maximum.accumulate(np.where(new_value, positions, 0), axis=1)
+        last_value = np.ones(matrix.shape, dtype=bool)
+        last_value[:, :-1] = new_value[:, 1:]
+        end = matrix.shape[1] - 1
+        high = end - np.maximum.accumulate(np.where(last_value, end - positions, 0)[:, ::-1], axis=1)[:, ::-1]
+        if ties == 'min':
+            sorted_rank = low.astype(float)
+        elif ties == 'max':
+            sorted_rank = high.astype(float)
+        else:
+            sorted_rank = (low + high) / 2.0
+
+    rank = np.empty(matrix.shape)
+    np.put_along_axis(rank, order, sorted_rank, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(ranked & (n_ranked > 1), (rank / (n_ranked - 1)) * 100, np.nan)
+    return pct.reshape(values.shape)
+
+
+def zscores(values, ddof=1):
+    """
+    Z-score and absolute ratio of every value against the non-NaN values of its row
+
+    Args:
+        values: 1-D array (one universe) or 2-D array (dates x indices)
+        ddof: Delta degrees of freedom of the standard deviation
+
+    Returns:
+        Tuple (zscore, abs_ratio) shaped like values: (value - mean) / sd and
+        value / sd; NaN where the value is NaN, the row has fewer than two
+        values or sd is 0
+    """
+    values = np.asarray(values, dtype=float)
+    ranked = np.isfinite(values)
+    n_ranked = ranked.sum(axis=-1, keepdims=True)
+    enough = n_ranked > max(ddof, 1)
+
+    if values.ndim == 1:
+        # Same reductions as np.mean/np.std over the list of values
+        sample = values[ranked]
+        mean = np.mean(sample) if enough.all() else np.nan
+        sd = np.std(sample, ddof=ddof) if enough.all() else np.nan
+    else:
+        clean = np.where(ranked, values, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nansum(clean, axis=-1, keepdims=True) / n_ranked
+            sd = np.sqrt(np.nansum((clean - mean) ** 2, axis=-1, keepdims=True) / (n_ranked - ddof))
+
+    ok = ranked & enough & (sd > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        zscore = np.where(ok, (values - mean) / sd, np.nan)
+        abs_ratio = np.where(ok, values / sd, np.nan)
+    return zscore, abs_ratio
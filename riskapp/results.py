@@ -0,0 +1,89 @@
+"""Columnar per-index results: one array per field, turned into JSON rows only when sent
+
+The metrics pipeline fills and post-processes whole columns (V1 lookups,
+momentum z-scores, rounding) instead of building a dict per index and
+patching it in several passes. to_records() produces the list-of-dicts rows
+the API returns; to_frame() gives the same data as a DataFrame.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _as_list(values):
+    """Column values as Python objects, None for NaN"""
+    if values.dtype.kind == 'f':
+        missing = np.isnan(values)
+        if missing.any():
+            values = values.astype(object)
+            values[missing] = None
+    return values.tolist()
+
+
+class MetricsTable:
+    """Per-index results as named columns of equal length
+
+    Float columns use NaN for null values. A field can also be absent from
+    some rows (left out of those rows' dicts, not set to null) through its
+    `present` mask.
+    """
+
+    def __init__(self, columns, present=None):
+        """
+        Args:
+            columns: Field name -> 1-D array, in output field order
+            present: Field name -> bool array; rows where it is False leave
+                the field out of to_records()
+        """
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.present = dict(present or {})
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        self._length = lengths.pop() if lengths else 0
+
+    @property
+    def fields(self):
+        """Field names in output order"""
+        return tuple(self.columns)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def to_records(self):
+        """
+        The rows as a list of new dicts (field order kept, NaN -> None)
+
+        Returns:
+            List of dictionaries, one per index
+        """
+        fields = self.fields
+        rows = [dict(zip(fields, values)) for values in zip(*(_as_list(col) for col in self.columns.values()))]
+        for field, mask in self.present.items():
+            for i in np.flatnonzero(~np.asarray(mask, dtype=bool)):
+                del rows[i][field]
+        return rows
+
+    def to_frame(self, index='Index Name'):
+        """
+        The table as a DataFrame (absent values become NaN)
+
+        Args:
+            index: Field to use as the row index (None = default RangeIndex)
+
+        Returns:
+            pandas DataFrame with one column per remaining field
+        """
+        columns = {}
+        for field, values in self.columns.items():
+            mask = self.present.get(field)
+            if mask is not None and not np.all(mask):
+                values = np.where(mask, values, np.nan)
+            columns[field] = values
+        frame = pd.DataFrame(columns)
+        if index is not None and index in frame.columns:
+            frame = frame.set_index(index)
+        return frame
@@ -0,0 +1,144 @@
+"""Trailing-window volatility of daily returns at every date, from prefix sums"""
+
+import numpy as np
+import pandas as pd
+
+from .engine import DURATION_YEARS, _ffill_positions, _step_returns
+
+
+class RollingVolatility:
+    """Running sums and sums of squares of each index's daily returns
+
+    Any trailing window then costs O(1) per date and index: its sums are the
+    difference of two prefix rows, so sliding the window forward a day never
+    rescans the history.
+    """
+
+    def __init__(self, frame):
+        """
+        Args:
+            frame: DATE-indexed price DataFrame (sorted, float columns)
+        """
+        self.index = frame.index
+        self.columns = list(frame.columns)
+        self._column_positions = {col: j for j, col in enumerate(self.columns)}
+
+        values = frame.to_numpy(dtype=float)
+        size, n = values.shape
+        # Return of each observation relative to the index's previous one
+        returns = np.full((size, n), np.nan)
+        if size > 1:
+            returns[1:] = _step_returns(values)
+        self._returns = returns
+
+        finite = np.isfinite(returns)
+        clean = np.where(finite, returns, 0.0)
+        # Row k of each prefix array covers rows 0..k-1
+        self._sum = _prefix(clean)
+        self._sum_sq = _prefix(clean * clean)
+        self._count = _prefix(finite.astype(np.int64))
+        self._infinite = _prefix(np.isinf(returns).astype(np.int64))
+
+        # First row at or after each row where the index has a price (size if none)
+        valid = ~np.isnan(values)
+        from_end = _ffill_positions(valid[::-1])[::-1]
+        self._next_valid = np.where(from_end >= 0, size - 1 - from_end, size)
+
+    def window_starts(self, window):
+        """
+        First row of the trailing window ending at every row
+
+        Args:
+            window: '1year', '3years', '5years', 'all' (expanding) or a
+                number of trading days (rows)
+
+        Returns:
+            int64 array aligned with the rows
+        """
+        size = len(self.index)
+        if window == 'all':
+            return np.zeros(size, dtype=np.int64)
+        if window in DURATION_YEARS:
+            cutoffs = (self.index - pd.DateOffset(years=DURATION_YEARS[window])).values
+            return np.searchsorted(self.index.values, cutoffs, side='left').astype(np.int64)
+        if isinstance(window, (int, np.integer)) and not isinstance(window, bool) and window > 0:
+            return np.maximum(np.arange(size) - window + 1, 0)
+        raise ValueError(f"Invalid window '{window}'")
+
+    def volatility(self, window='3years', columns=None, rows=None):
+        """
+        Annualized volatility of daily returns over a trailing window, at every date
+
+        The value at each date equals the whole-window ``std(ddof=1) * sqrt(252)``
+        of the returns inside that window, as get_metrics computes for the
+        latest date (the first price in the window has no return).
+
+        Args:
+            window: See window_starts
+            columns: Index names to include (default: all)
+            rows: Positions of the dates to evaluate (default: every date)
+
+        Returns:
+            DataFrame (dates x indices), NaN where a window has fewer than two
+            returns or an infinite one
+        """
+        if columns is None:
+            columns = self.columns
+        if rows is None:
+            rows = np.arange(len(self.index))
+        rows = np.asarray(rows, dtype=np.int64)
+        vol = self.window_volatility(self.window_starts(window)[rows], rows, columns)
+        return pd.DataFrame(vol, index=self.index[rows], columns=list(columns))
+
+    def window_volatility(self, starts, rows, columns=None):
+        """
+        Annualized volatility of daily returns over explicit row windows
+
+        Args:
+            starts: First row of each window
+            rows: Last row (inclusive) of each window, aligned with starts
+            columns: Index names to include (default: all)
+
+        Returns:
+            float array (windows x indices), NaN where a window has fewer than
+            two returns or an infinite one
+        """
+        if columns is None:
+            columns = self.columns
+        cols = np.array([self._column_positions[col] for col in columns], dtype=np.int64)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(rows, dtype=np.int64) + 1
+
+        total = self._sum[ends][:, cols] - self._sum[starts][:, cols]
+        total_sq = self._sum_sq[ends][:, cols] - self._sum_sq[starts][:, cols]
+        count = self._count[ends][:, cols] - self._count[starts][:, cols]
+        infinite = self._infinite[ends][:, cols] - self._infinite[starts][:, cols]
+
+        # Drop the return of each window's first price, which reaches back before the window
+        size = len(self.index)
+        first = self._next_valid[np.minimum(starts, size - 1)][:, cols]
+        inside = first < ends[:, None]
+        first_return = self._returns[np.minimum(first, size - 1), cols[None, :]]
+        drop = inside & np.isfinite(first_return)
+        total = total - np.where(drop, first_return, 0.0)
+        total_sq = total_sq - np.where(drop, first_return * first_return, 0.0)
+        count = count - drop
+        infinite = infinite - (inside & np.isinf(first_return))
+
+        vol = np.full(count.shape, np.nan)
+        ok = (count > 1) & (infinite == 0)
+        variance = (total_sq[ok] - total[ok] * total[ok] / count[ok]) / (count[ok] - 1)
+        vol[ok] = np.sqrt(np.maximum(variance, 0.0)) * np.sqrt(252)
+        return vol
+
+
+def _prefix(values):
+    """Cumulative sum down the rows with a leading row of zeros"""
+    out = np.zeros((values.shape[0] + 1, values.shape[1]), dtype=values.dtype)
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+def build_rolling_volatility(frame):
+    """Build a RollingVolatility (for use with PriceSnapshot.derived)"""
+    return RollingVolatility(frame)
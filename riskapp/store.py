@@ -0,0 +1,282 @@
+"""Process-wide price panel store with reload-on-change"""
+
+import csv
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .panelfile import append_rows, read_panel, sidecar_path, write_panel
+
+
+def read_price_csv(csv_path):
+    """
+    Parse a price CSV into a DATE-indexed float DataFrame
+
+    Args:
+        csv_path: Path (or text buffer) of a CSV with a 'DATE' column (dd/mm/yy)
+            and one column per index
+
+    Returns:
+        pandas DataFrame sorted by date with float price columns
+    """
+    df = pd.read_csv(csv_path)
+    if "DATE" not in df.columns:
+        raise ValueError("Expected a 'DATE' column in the CSV.")
+
+    # Parse DATE and sort
+    df["DATE"] = pd.to_datetime(df["DATE"], format='%d/%m/%y', errors="coerce")
+    df = df.dropna(subset=["DATE"]).sort_values("DATE")
+    df = df.set_index("DATE")
+
+    return df.astype(float)
+
+
+def csv_fingerprint(csv_path):
+    """Return (mtime_ns, size) of the CSV file"""
+    st = os.stat(csv_path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def convert_csv(csv_path):
+    """
+    Parse a price CSV and write its binary sidecar next to it
+
+    Args:
+        csv_path: Path to CSV file with price data
+
+    Returns:
+        Path of the written sidecar
+    """
+    source = csv_fingerprint(csv_path)
+    path = sidecar_path(csv_path)
+    write_panel(read_price_csv(csv_path), path, source)
+    return path
+
+
+def load_price_frame(csv_path, write_sidecar=True, mmap=False):
+    """
+    Load a price CSV, preferring its binary sidecar when it matches the CSV
+
+    Args:
+        csv_path: Path to CSV file with price data
+        write_sidecar: Write a fresh sidecar after a full CSV parse (best effort)
+        mmap: Memory-map the sidecar read-only (shared between processes)
+            instead of reading it into private memory
+
+    Returns:
+        pandas DataFrame indexed by DATE with float price columns
+    """
+    source = csv_fingerprint(csv_path)
+    path = sidecar_path(csv_path)
+    if os.path.exists(path):
+        try:
+            sidecar_source, frame = read_panel(path, mmap=mmap)
+            if sidecar_source == source:
+                return frame
+        except (OSError, ValueError):
+            pass
+
+    frame = read_price_csv(csv_path)
+    if write_sidecar:
+        try:
+            write_panel(frame, path, source)
+        except OSError:
+            # Read-only deployments just keep parsing the CSV
+            return frame
+        if mmap:
+            # Swap the private copy for the shared mapping of what was just written
+            return read_panel(path, mmap=True)[1]
+    return frame
+
+
+def append_price_rows(csv_path, rows):
+    """
+    Append new trading days to a price CSV and its binary sidecar
+
+    Only the new lines are written; the sidecar grows in place instead of
+    being rebuilt, so readers pick up the new days without a full parse.
+
+    Args:
+        csv_path: Path to CSV file with price data
+        rows: DATE-indexed DataFrame of new prices; columns must be existing
+            index names (missing ones are written empty), dates must be later
+            than the last date in the file
+
+    Returns:
+        DataFrame of the appended rows exactly as a reparse of the CSV reads
+        them (every column, in file order)
+    """
+    if len(rows) == 0:
+        return rows
+
+    before = csv_fingerprint(csv_path)
+    frame = load_price_frame(csv_path, mmap=True)
+    unknown = [col for col in rows.columns if col not in frame.columns]
+    if unknown:
+        raise ValueError(f"Unknown index names: {', '.join(map(str, unknown))}")
+
+    rows = rows.sort_index()
+    if len(frame) and rows.index[0] <= frame.index[-1]:
+        raise ValueError(
+            f"New rows must be after {frame.index[-1]:%d/%m/%y}, got {rows.index[0]:%d/%m/%y}"
+        )
+
+    with open(csv_path, newline='') as f:
+        header = next(csv.reader(f))
+    rows = rows.reindex(columns=frame.columns)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for date, prices in zip(rows.index, rows.to_numpy(dtype=float)):
+        # Header fields other than DATE map to the frame columns by position,
+        # which also covers duplicate names that pandas renamed to 'NAME.1'
+        values = iter('' if np.isnan(price) else repr(float(price)) for price in prices)
+        writer.writerow([f"{date:%d/%m/%y}" if field == "DATE" else next(values) for field in header])
+    lines = buffer.getvalue()
+
+    with open(csv_path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.write(lines.encode())
+
+    # Parse the new lines the same way a full reload would
+    header_line = io.StringIO()
+    csv.writer(header_line, lineterminator='\n').writerow(header)
+    appended = read_price_csv(io.StringIO(header_line.getvalue() + lines))
+    appended.columns = frame.columns
+
+    after = csv_fingerprint(csv_path)
+    path = sidecar_path(csv_path)
+    try:
+        grown = append_rows(path, appended.index.values, appended.to_numpy(dtype=float),
+                            after, expected_source=before)
+    except (OSError, ValueError):
+        grown = False
+    if not grown:
+        try:
+            convert_csv(csv_path)
+        except OSError:
+            pass
+    return appended
+
+
+class PriceSnapshot:
+    """One parsed version of the price CSV plus data derived from it"""
+
+    def __init__(self, fingerprint, frame):
+        self.fingerprint = fingerprint
+        self.frame = frame
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived(self, name, build):
+        """
+        Get data computed from this version's frame, building it on first use
+
+        Args:
+            name: Cache name of the derived data
+            build: Callable taking the frame and returning the derived data
+
+        Returns:
+            The derived data, shared by every caller of this snapshot
+        """
+        value = self._derived.get(name)
+        if value is None:
+            with self._lock:
+                value = self._derived.get(name)
+                if value is None:
+                    value = build(self.frame)
+                    self._derived[name] = value
+        return value
+
+
+class PriceStore:
+    """Keeps one parsed copy of a price CSV and reloads it when the file changes"""
+
+    def __init__(self, csv_path, mmap=True):
+        """
+        Args:
+            csv_path: Path to CSV file with price data
+            mmap: Back the frame with a read-only memory map of the binary
+                sidecar, so all worker processes share one copy of the prices
+        """
+        self.csv_path = csv_path
+        self.mmap = mmap
+        self._lock = threading.Lock()
+        # Replaced as a whole on reload so readers never see a frame paired
+        # with the wrong fingerprint or derived data
+        self._snapshot = None
+
+    def fingerprint(self):
+        """Return (mtime_ns, size) of the CSV file"""
+        return csv_fingerprint(self.csv_path)
+
+    def snapshot(self):
+        """
+        Get the current PriceSnapshot, reloading the CSV if it has changed
+
+        Returns:
+            PriceSnapshot whose frame must not be modified in place
+        """
+        fingerprint = self.fingerprint()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.fingerprint == fingerprint:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.fingerprint == fingerprint:
+                return snapshot
+
+            snapshot = PriceSnapshot(fingerprint, load_price_frame(self.csv_path, mmap=self.mmap))
+            self._snapshot = snapshot
+            return snapshot
+
+    def clear(self):
+        """Drop the loaded snapshot so the next access loads the file again"""
+        with self._lock:
+            self._snapshot = None
+
+    def get_frame(self):
+        """
+        Get the parsed price panel, reloading it if the file has changed
+
+        Returns:
+            pandas DataFrame indexed by DATE. Shared between callers - do not modify in place.
+        """
+        return self.snapshot().frame
+
+    @property
+    def version(self):
+        """Fingerprint of the currently loaded frame, or None if nothing is loaded"""
+        snapshot = self._snapshot
+        return snapshot.fingerprint if snapshot is not None else None
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_price_store(csv_path):
+    """
+    Get the shared PriceStore for a CSV path (one per process)
+
+    Args:
+        csv_path: Path to CSV file with price data
+
+    Returns:
+        PriceStore instance
+    """
+    key = os.path.abspath(csv_path)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = PriceStore(key)
+            _STORES[key] = store
+        return store
@@ -0,0 +1,53 @@
+"""Synthetic price panels in the data.csv layout (for benchmarks and experiments)"""
+
+import numpy as np
+import pandas as pd
+
+
+def make_price_panel(n_indices=130, years=20, missing_ratio=0.02, staggered=True,
+                     end='2025-12-31', seed=0):
+    """
+    Random-walk price panel shaped like data.csv
+
+    Args:
+        n_indices: Number of index/fund columns
+        years: Years of business-day history
+        missing_ratio: Fraction of prices after inception that are blanked out
+        staggered: Give each index a random inception date in the first
+            three quarters of the history (prices before it are missing)
+        end: Last date
+        seed: Random seed
+
+    Returns:
+        DATE-indexed float DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=max(int(years * 252), 2), name='DATE')
+    size = len(dates)
+
+    drift = rng.normal(0.0004, 0.0002, n_indices)
+    vol = rng.uniform(0.005, 0.02, n_indices)
+    returns = rng.normal(drift, vol, (size, n_indices))
+    values = 1000 * np.exp(np.cumsum(returns, axis=0))
+
+    if staggered:
+        inception = rng.integers(0, max(size * 3 // 4, 1), n_indices)
+        values[np.arange(size)[:, None] < inception[None, :]] = np.nan
+    if missing_ratio > 0:
+        values[rng.random(values.shape) < missing_ratio] = np.nan
+
+    return pd.DataFrame(values, index=dates, columns=[f"IDX{i:04d}" for i in range(n_indices)])
+
+
+def write_price_csv(frame, path):
+    """
+    Write a price panel as a data.csv-style file (DATE as dd/mm/yy)
+
+    Args:
+        frame: DATE-indexed price DataFrame
+        path: Destination CSV path
+    """
+    out = frame.copy()
+    out.index = out.index.strftime('%d/%m/%y')
+    out.index.name = 'DATE'
+    out.to_csv(path)
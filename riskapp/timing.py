@@ -0,0 +1,154 @@
+"""Per-stage timing histograms with Prometheus and Server-Timing output"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds in seconds (Prometheus 'le' labels); +Inf is implied
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        """Record one duration (caller holds the registry lock)"""
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class StageTimer:
+    """Collects stage durations per endpoint into histograms
+
+    While a request is active (between begin() and end()), its stages are
+    also kept in order so they can be reported in a Server-Timing header.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets: Histogram bucket upper bounds in seconds
+        """
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._current = ContextVar('riskapp_stage_timer', default=None)
+
+    def begin(self, endpoint):
+        """
+        Start collecting stages for one request
+
+        Args:
+            endpoint: Label for stages timed without an explicit endpoint
+
+        Returns:
+            Token to pass to end()
+        """
+        return self._current.set((endpoint, []))
+
+    def end(self, token):
+        """
+        Stop collecting and return the request's stages
+
+        Returns:
+            List of (stage, seconds) in the order they finished
+        """
+        current = self._current.get()
+        self._current.reset(token)
+        return current[1] if current is not None else []
+
+    def observe(self, stage, seconds, endpoint=None):
+        """
+        Record a duration
+
+        Args:
+            stage: Stage name (load, filter, compute, rank, serialize, ...)
+            seconds: Duration
+            endpoint: Endpoint label; defaults to the active request's endpoint
+        """
+        current = self._current.get()
+        if endpoint is None:
+            endpoint = current[0] if current is not None else 'background'
+        if current is not None:
+            current[1].append((stage, seconds))
+
+        key = (endpoint, stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def stage(self, stage, endpoint=None):
+        """Time the body of a with-block as one stage (see observe)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, endpoint)
+
+    def render_prometheus(self, name='riskapp_stage_seconds'):
+        """
+        All histograms in the Prometheus text exposition format
+
+        Returns:
+            str ending with a newline
+        """
+        lines = [
+            f"# HELP {name} Time spent per endpoint and stage.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            items = sorted(
+                (key, list(h.counts), h.sum, h.count) for key, h in self._histograms.items()
+            )
+        for (endpoint, stage), counts, total, count in items:
+            labels = f'endpoint="{_escape(endpoint)}",stage="{_escape(stage)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {total:.9f}')
+            lines.append(f'{name}_count{{{labels}}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Drop all recorded histograms"""
+        with self._lock:
+            self._histograms.clear()
+
+
+def server_timing(stages):
+    """
+    Server-Timing header value for a list of (stage, seconds)
+
+    Repeated stages are summed so each name appears once.
+    """
+    totals = {}
+    for stage, seconds in stages:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in totals.items())
+
+
+def _escape(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Process-wide timer shared by app.py and the package
+TIMER = StageTimer()
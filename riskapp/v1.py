@@ -0,0 +1,100 @@
+"""V1 computed from the price panel: cross-sectional percentile of 5-year CAGR
+
+V1 = (number of indices with a lower 5-year CAGR) / (number of indices with a
+5-year CAGR), on a 0-1 scale - the calculation check_v1.py walks through by
+hand. Higher = better performer over the last five years.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .priceindex import PriceIndex, get_price_index
+
+V1_SOURCES = ('excel', 'computed')
+V1_YEARS = 5
+
+
+def cagr_from_return(cumulative, years):
+    """Annualized % return from a cumulative % return over `years`"""
+    with np.errstate(invalid='ignore'):
+        return ((1.0 + np.asarray(cumulative, dtype=float) / 100) ** (1.0 / years) - 1.0) * 100
+
+
+def v1_percentiles(cagr):
+    """
+    Share of the other indices with a strictly lower value, for every index
+
+    Args:
+        cagr: Per-index array (NaN = no value, left out of the ranking)
+
+    Returns:
+        float array in [0, 1) aligned with cagr, NaN where cagr is NaN
+    """
+    cagr = np.asarray(cagr, dtype=float)
+    ranked = np.isfinite(cagr)
+    out = np.full(cagr.shape, np.nan)
+    total = np.count_nonzero(ranked)
+    if total:
+        ordered = np.sort(cagr[ranked])
+        out[ranked] = np.searchsorted(ordered, cagr[ranked], side='left') / total
+    return out
+
+
+def compute_v1(frame, years=V1_YEARS, price_index=None):
+    """
+    V1 for every index of a price panel in one vectorized pass
+
+    Args:
+        frame: DATE-indexed price DataFrame (the whole universe - V1 is a
+            cross-sectional rank)
+        years: Lookback in calendar years, anchored on each index's latest date
+        price_index: PriceIndex of frame, if one is already built
+
+    Returns:
+        DataFrame indexed by index name with columns cagr (% per year) and v1
+    """
+    if price_index is None:
+        price_index = PriceIndex(frame)
+    cumulative = price_index.trailing_return(years)
+    cagr = cagr_from_return(cumulative, years)
+    cagr[~np.isfinite(cagr)] = np.nan
+    return pd.DataFrame({'cagr': cagr, 'v1': v1_percentiles(cagr)}, index=list(frame.columns))
+
+
+def build_v1_map(frame, price_index=None):
+    """
+    Index name -> V1 rounded to 3 decimals, without indices lacking 5 years of data
+    """
+    v1 = compute_v1(frame, price_index=price_index)['v1']
+    return {name: round(float(value), 3) for name, value in v1.items() if not np.isnan(value)}
+
+
+def get_v1_map(snapshot):
+    """build_v1_map of a PriceSnapshot, rebuilt with every data refresh"""
+    price_index = get_price_index(snapshot)
+    return snapshot.derived('v1', lambda frame: build_v1_map(frame, price_index))
+
+
+def reconcile_v1(computed, workbook, tolerance=0.05):
+    """
+    Compare computed V1 values with the ones from heatmap values.xlsx
+
+    Args:
+        computed: Index name -> computed V1
+        workbook: Index name -> workbook V1
+        tolerance: Largest absolute difference that still counts as a match
+
+    Returns:
+        DataFrame indexed by index name with columns computed, workbook,
+        difference and match, largest differences first; indices present on
+        only one side have NaN on the other and match False
+    """
+    names = list(dict.fromkeys(list(computed) + list(workbook)))
+    table = pd.DataFrame({
+        'computed': [computed.get(name, np.nan) for name in names],
+        'workbook': [workbook.get(name, np.nan) for name in names],
+    }, index=names, dtype=float)
+    table['difference'] = table['computed'] - table['workbook']
+    table['match'] = table['difference'].abs() <= tolerance
+    order = np.argsort(-table['difference'].abs().fillna(np.inf).to_numpy(), kind='stable')
+    return table.iloc[order]
@@ -0,0 +1,203 @@
+"""Shared, snapshot-backed V1 values from heatmap values.xlsx
+
+Parsing the workbook needs openpyxl and takes far longer than everything else
+at startup, so the parsed rows are kept in a small JSON snapshot next to it
+(``heatmap values.xlsx`` -> ``heatmap values.xlsx.v1.json``) keyed by a hash of
+the workbook bytes. While the hash matches, the workbook is never opened with
+pandas/openpyxl; editing it triggers one re-parse and a fresh snapshot.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from .cache import file_fingerprint
+
+SNAPSHOT_SUFFIX = '.v1.json'
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_path(excel_path):
+    """Path of the JSON snapshot for a V1 workbook"""
+    return excel_path + SNAPSHOT_SUFFIX
+
+
+def workbook_digest(excel_path):
+    """Content hash of the workbook (hex)"""
+    with open(excel_path, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def read_v1_workbook(excel_path):
+    """
+    Parse the V1 workbook (imports pandas' Excel reader, i.e. openpyxl)
+
+    Args:
+        excel_path: Path to heatmap values.xlsx
+
+    Returns:
+        Tuple (full_names, percentiles) of equal-length lists in sheet order
+    """
+    import pandas as pd
+
+    df = pd.read_excel(excel_path)
+    return df['Full Name'].tolist(), [float(v) for v in df['Percentile Value'].tolist()]
+
+
+class V1Snapshot:
+    """One version of the V1 workbook rows plus per-mapping lookups built from them"""
+
+    def __init__(self, fingerprint, full_names, percentiles):
+        self.fingerprint = fingerprint
+        self.full_names = full_names
+        self.percentiles = percentiles
+        self._mapped = {}
+        self._lock = threading.Lock()
+
+    def by_column(self, resolver):
+        """
+        V1 percentile and full name per CSV column name
+
+        Args:
+            resolver: NameResolver mapping workbook full names to CSV column
+                names (names it doesn't know are used as they are)
+
+        Returns:
+            Tuple (v1_map, fullname_map): column -> percentile rounded to 2
+            decimals and column -> full name. Shared - do not modify.
+        """
+        key = id(resolver)
+        mapped = self._mapped.get(key)
+        if mapped is None:
+            with self._lock:
+                mapped = self._mapped.get(key)
+                if mapped is None:
+                    v1_map, fullname_map = {}, {}
+                    for full_name, percentile in zip(self.full_names, self.percentiles):
+                        column_name = resolver.resolve(full_name, full_name)
+                        v1_map[column_name] = round(percentile, 2)
+                        fullname_map[column_name] = full_name
+                    # Keep the resolver alive so its id can't be reused
+                    mapped = (resolver, v1_map, fullname_map)
+                    self._mapped[key] = mapped
+        return mapped[1], mapped[2]
+
+
+def _read_snapshot(path, digest):
+    """Rows from a JSON snapshot, or None if it is missing, stale or unreadable"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != SNAPSHOT_VERSION or data.get('digest') != digest:
+        return None
+    full_names, percentiles = data.get('full_names'), data.get('percentiles')
+    if not isinstance(full_names, list) or not isinstance(percentiles, list) \
+            or len(full_names) != len(percentiles):
+        return None
+    return full_names, percentiles
+
+
+def _write_snapshot(path, digest, full_names, percentiles):
+    """Write a JSON snapshot atomically (best effort)"""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': SNAPSHOT_VERSION,
+                'digest': digest,
+                'full_names': full_names,
+                'percentiles': percentiles,
+            }, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Read-only deployments just parse the workbook once per process
+        pass
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_v1_rows(excel_path, write_snapshot=True):
+    """
+    Load the V1 workbook rows, preferring the JSON snapshot when it matches
+
+    Args:
+        excel_path: Path to heatmap values.xlsx
+        write_snapshot: Write a fresh snapshot after parsing the workbook
+
+    Returns:
+        Tuple (full_names, percentiles)
+    """
+    digest = workbook_digest(excel_path)
+    path = snapshot_path(excel_path)
+    rows = _read_snapshot(path, digest)
+    if rows is not None:
+        return rows
+
+    full_names, percentiles = read_v1_workbook(excel_path)
+    if write_snapshot:
+        _write_snapshot(path, digest, full_names, percentiles)
+    return full_names, percentiles
+
+
+class V1Store:
+    """Keeps one parsed copy of the V1 workbook and reloads it when the file changes"""
+
+    def __init__(self, excel_path):
+        """
+        Args:
+            excel_path: Path to heatmap values.xlsx
+        """
+        self.excel_path = excel_path
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def snapshot(self):
+        """
+        Get the current V1Snapshot, reloading the workbook if it has changed
+
+        Returns:
+            V1Snapshot
+
+        Raises:
+            OSError, ValueError or KeyError if the workbook can't be read
+        """
+        fingerprint = file_fingerprint(self.excel_path)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.fingerprint == fingerprint:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.fingerprint == fingerprint:
+                return snapshot
+
+            snapshot = V1Snapshot(fingerprint, *load_v1_rows(self.excel_path))
+            self._snapshot = snapshot
+            return snapshot
+
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_v1_store(excel_path):
+    """
+    Get the shared V1Store for a workbook path (one per process)
+
+    Args:
+        excel_path: Path to heatmap values.xlsx
+
+    Returns:
+        V1Store instance
+    """
+    key = os.path.abspath(excel_path)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = V1Store(key)
+            _STORES[key] = store
+        return store
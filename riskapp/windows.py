@@ -0,0 +1,189 @@
+"""Metrics over arbitrary start/end/as-of date windows from precomputed prefix sums"""
+
+import numpy as np
+import pandas as pd
+
+from .cache import LRUCache
+from .engine import DURATION_YEARS, NS_PER_DAY, _avg_monthly_profit
+from .priceindex import get_price_index
+from .rolling import build_rolling_volatility
+
+
+def _timestamp(value, name):
+    """Parse a date argument, raising ValueError with the argument's name"""
+    try:
+        ts = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        ts = pd.NaT
+    if ts is pd.NaT:
+        raise ValueError(f"Invalid {name} date '{value}'")
+    return np.datetime64(ts.tz_localize(None) if ts.tzinfo else ts, 'ns')
+
+
+def resolve_window(index, duration='all', start=None, end=None, as_of=None):
+    """
+    Row window of a metrics request (two binary searches over the dates)
+
+    Args:
+        index: Sorted DatetimeIndex of the price frame
+        duration: '3years' / '5years' window ending at the last row ('all' or
+            anything else = from the first row); ignored when start is given
+        start: First date of the window (inclusive)
+        end: Last date of the window (inclusive)
+        as_of: Evaluate as if the data ended on this date (inclusive)
+
+    Returns:
+        Tuple (start_row, end_row); the window is empty when start_row > end_row
+
+    Raises:
+        ValueError for a date that can't be parsed
+    """
+    dates = index.values.astype('datetime64[ns]')
+    end_row = len(dates) - 1
+    for name, bound in (('end', end), ('as_of', as_of)):
+        if bound is not None:
+            end_row = min(end_row, int(np.searchsorted(dates, _timestamp(bound, name), side='right')) - 1)
+
+    if start is not None:
+        start_row = int(np.searchsorted(dates, _timestamp(start, 'start'), side='left'))
+    elif duration in ('3years', '5years') and end_row >= 0:
+        cutoff = index[end_row] - pd.DateOffset(years=DURATION_YEARS[duration])
+        start_row = int(np.searchsorted(dates, np.datetime64(cutoff, 'ns'), side='left'))
+    else:
+        start_row = 0
+    return start_row, end_row
+
+
+class WindowIndex:
+    """Observation counts and first/last price positions of every index, for any window
+
+    Together with the RollingVolatility prefix sums this answers CAGR,
+    volatility and 12-month momentum of every index over any [start, end] row
+    window with a handful of O(indices) lookups, without filtering the frame.
+    """
+
+    def __init__(self, frame, rolling, price_index):
+        """
+        Args:
+            frame: DATE-indexed price DataFrame (sorted, float columns)
+            rolling: RollingVolatility built from the same frame
+            price_index: PriceIndex built from the same frame
+        """
+        self.index = frame.index
+        self.columns = list(frame.columns)
+        self.rolling = rolling
+        self.price_index = price_index
+        self._values = price_index.values
+        self._day_num = frame.index.values.astype('datetime64[ns]').view('i8') // NS_PER_DAY
+        self._anchored = LRUCache(maxsize=32)
+
+    def metrics(self, start_row, end_row):
+        """
+        Metrics of every index over one row window, as compute_panel_metrics
+        computes them for the same rows
+
+        Args:
+            start_row: First row of the window
+            end_row: Last row of the window (inclusive)
+
+        Returns:
+            Dict of arrays aligned with columns: valid, cagr, annual_vol and
+            momentum_12m (NaN where not available)
+        """
+        size, n = self._values.shape
+        out = {name: np.full(n, np.nan) for name in ('cagr', 'annual_vol', 'momentum_12m')}
+        out['valid'] = np.zeros(n, dtype=bool)
+        start_row = max(start_row, 0)
+        if end_row < start_row or start_row >= size:
+            return out
+
+        cols = np.arange(n)
+        prices = self.price_index
+        count = prices.obs_counts(start_row, end_row)
+        has_data = count > 0
+        first = np.where(has_data, prices.first_obs_rows(start_row), 0)
+        last = np.where(has_data, prices.last_obs_rows(end_row), 0)
+        p_start = np.where(has_data, self._values[first, cols], np.nan)
+        p_end = np.where(has_data, self._values[last, cols], np.nan)
+        n_days = np.where(has_data, self._day_num[last] - self._day_num[first], 0)
+
+        # 1. CAGR between the window's first and last price
+        ok = (count >= 2) & (n_days > 0) & (p_start != 0)
+        cagr = out['cagr']
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            n_years = n_days[ok] / 365.0
+            cagr[ok] = (p_end[ok] / p_start[ok]) ** (1.0 / n_years) - 1.0
+        cagr[~np.isfinite(cagr)] = np.nan
+
+        # 2. Volatility from the prefix sums of daily returns
+        annual_vol = self.rolling.window_volatility([start_row], [end_row], self.columns)[0]
+        out['annual_vol'] = annual_vol
+        out['valid'] = np.isfinite(cagr) & np.isfinite(annual_vol)
+
+        # 3. 12-month momentum: last price vs the 252nd-from-last observation in the window
+        has_year = count >= 252
+        if has_year.any():
+            back = np.where(has_year, prices.nth_last_obs_rows(end_row, 252), 0)
+            p_12m_ago = np.where(has_year, self._values[back, cols], np.nan)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                momentum_12m = np.where(p_12m_ago != 0, (p_end - p_12m_ago) / p_12m_ago * 100, np.nan)
+            momentum_12m[~np.isfinite(momentum_12m)] = np.nan
+            out['momentum_12m'] = momentum_12m
+        return out
+
+    def anchored_metrics(self, end_row):
+        """
+        Metrics anchored on each index's latest date up to end_row
+
+        These look back a fixed number of calendar years from each index's own
+        last price, so they only depend on the as-of row (not the window start)
+        and are kept for the most recently used as-of rows.
+
+        Returns:
+            Dict with cumulative_5y and avg_monthly_profit_4y arrays (shared -
+            do not modify)
+        """
+        return self._anchored.get_or_compute(end_row, lambda: self._anchored_metrics(end_row))
+
+    def _anchored_metrics(self, end_row):
+        values = self._values[:end_row + 1]
+        dates = self.index.values[:end_row + 1].astype('datetime64[ns]')
+        n = len(self.columns)
+        if len(values) == 0:
+            return {'cumulative_5y': np.full(n, np.nan), 'avg_monthly_profit_4y': np.full(n, np.nan)}
+        count = self.price_index.obs_counts(0, end_row)
+        last = np.where(count > 0, self.price_index.last_obs_rows(end_row), 0)
+        return {
+            'cumulative_5y': self.price_index.trailing_return(5, end_row),
+            'avg_monthly_profit_4y': _avg_monthly_profit(values, dates, last, count, 4),
+        }
+
+
+def window_panel_metrics(window_index, start_row, end_row, columns=None):
+    """
+    compute_panel_metrics-style result for one row window
+
+    Args:
+        window_index: WindowIndex of the full price frame
+        start_row: First row of the window
+        end_row: Last row of the window (inclusive)
+        columns: Index names to return, in this order (default: all)
+
+    Returns:
+        Dict of arrays aligned with columns: valid, cagr, annual_vol,
+        momentum_12m, cumulative_5y and avg_monthly_profit_4y
+    """
+    panel = window_index.metrics(start_row, end_row)
+    panel.update(window_index.anchored_metrics(end_row))
+    if columns is not None and list(columns) != window_index.columns:
+        positions = {col: j for j, col in enumerate(window_index.columns)}
+        take = np.array([positions[col] for col in columns], dtype=np.int64)
+        panel = {name: values[take] for name, values in panel.items()}
+    return panel
+
+
+def get_window_index(snapshot):
+    """Build the WindowIndex of a PriceSnapshot, sharing its RollingVolatility and PriceIndex"""
+    rolling = snapshot.derived('rolling_volatility', build_rolling_volatility)
+    price_index = get_price_index(snapshot)
+    return snapshot.derived('window_index', lambda frame: WindowIndex(frame, rolling, price_index))
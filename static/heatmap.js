@@ -21,6 +21,9 @@ const MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Se
 let currentData = [];
 let currentSort = { column: 'name', ascending: true };
 
+// Heatmap payloads per index -> mode -> timeline, filled by one batch request
+const heatmapCache = {};
+
 // Load and display data based on URL parameters
 async function loadHeatmapData() {
     const urlParams = new URLSearchParams(window.location.search);
@@ -45,11 +48,16 @@ async function loadIndexHeatmap(indexName) {
     try {
         const mode = document.getElementById('return-mode')?.value || 'trailing';
         const timeline = document.getElementById('timeline')?.value || '3';
-        const cacheBuster = new Date().getTime();
-        const res = await fetch(`${basePath}/api/heatmap_data?index=${encodeURIComponent(indexName)}&duration=all&mode=${mode}&timeline=${timeline}&_=${cacheBuster}`);
-        if (!res.ok) throw new Error('Failed to fetch heatmap data');
         
-        const data = await res.json();
+        // First view of an index prefetches every mode and timeline of every
+        // index in its category at once, so switching them afterwards needs no
+        // round trip and the other indices of the category share one cached
+        // response
+        if (!heatmapCache[indexName]) {
+            await prefetchHeatmaps(categoryMembers(indexName));
+        }
+        const data = heatmapCache[indexName]?.[mode]?.[timeline];
+        if (!data) throw new Error('Failed to fetch heatmap data');
         
         document.getElementById('loading').classList.add('hidden');
         document.getElementById('heatmap-container').classList.remove('hidden');
@@ -62,6 +70,24 @@ async function loadIndexHeatmap(indexName) {
     }
 }
 
+// Every index of the category an index belongs to (just the index if it has none)
+function categoryMembers(indexName) {
+    const members = Object.values(categories).find(names => names.includes(indexName));
+    return members || [indexName];
+}
+
+// Fetch heatmaps for several indices (all modes and timelines) in one request
+async function prefetchHeatmaps(indexNames) {
+    const params = new URLSearchParams({ duration: 'all' });
+    indexNames.forEach(name => params.append('index', name));
+    
+    const res = await fetch(`${basePath}/api/heatmap_batch?${params.toString()}`);
+    if (!res.ok) throw new Error('Failed to fetch heatmap data');
+    
+    const data = await res.json();
+    Object.assign(heatmapCache, data.heatmaps);
+}
+
 // Load category table view
 async function loadCategoryTable(category) {
     try {